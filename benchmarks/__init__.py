@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Corsair benchmarks. Run them from the repository root, for example::
+
+    python3 -m benchmarks.bench_phases --regs 1000
+    python3 benchmarks/bench_memory.py
+"""
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Memory footprint of the register map object model.
+
+Builds a synthetic register map with 100k bit fields and reports how many bytes are allocated per register,
+bit field and enum. Run from the repository root::
+
+    python3 benchmarks/bench_memory.py
+"""
+
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from corsair import EnumValue, BitField, Register, RegisterMap  # noqa: E402
+
+REGS_NUM = 25000
+BITFIELDS_PER_REG = 4
+ENUMS_PER_BITFIELD = 2
+
+
+def build_regmap():
+    """Create a register map: every register has 8-bit wide fields, every field has enums."""
+    rmap = RegisterMap()
+    regs = []
+    for i in range(REGS_NUM):
+        reg = Register('REG%d' % i, 'Register %d' % i, i * 4)
+        for j in range(BITFIELDS_PER_REG):
+            bf = BitField('BF%d' % j, 'Bit field %d' % j, lsb=j * 8, width=8, access='rw', hardware='o')
+            bf.add_enums([EnumValue('E%d' % k, k, 'Enum %d' % k) for k in range(ENUMS_PER_BITFIELD)])
+            reg.add_bitfields(bf)
+        regs.append(reg)
+    rmap.add_registers_bulk(regs)
+    return rmap
+
+
+def main():
+    tracemalloc.start()
+    rmap = build_regmap()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    bitfields_num = REGS_NUM * BITFIELDS_PER_REG
+    enums_num = bitfields_num * ENUMS_PER_BITFIELD
+    print("registers: %d, bit fields: %d, enums: %d" % (len(rmap), bitfields_num, enums_num))
+    print("total allocated: %.1f MiB" % (allocated / 2**20))
+    print("bytes per register (with its bit fields and enums): %d" % (allocated // REGS_NUM))
+    print("bytes per bit field (with its enums): %d" % (allocated // bitfields_num))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Time and peak memory of every corsair phase on a synthetic register map.
+
+Phases are: writing and reading of the register map file in every format, validation and every generator,
+documentation with and without register images. Results are printed as JSON, so they can be compared
+across commits. Run from the repository root::
+
+    python3 -m benchmarks.bench_phases --regs 1000 -o bench.json
+"""
+
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import corsair  # noqa: E402
+from corsair import RegisterMap, generators  # noqa: E402
+from benchmarks.synth import synth_regmap  # noqa: E402
+
+# Generators to run on the register map: phase name -> (generator class, parameters)
+GENERATORS = {
+    'generate.json': (generators.Json, {}),
+    'generate.yaml': (generators.Yaml, {}),
+    'generate.v_module': (generators.Verilog, {}),
+    'generate.vhdl_module': (generators.Vhdl, {}),
+    'generate.v_header': (generators.VerilogHeader, {}),
+    'generate.c_header': (generators.CHeader, {}),
+    'generate.sv_pkg': (generators.SystemVerilogPackage, {}),
+    'generate.lb_bridge_v': (generators.LbBridgeVerilog, {}),
+    'generate.lb_bridge_vhdl': (generators.LbBridgeVhdl, {}),
+    'generate.py': (generators.Python, {}),
+    'generate.md': (generators.Markdown, {'print_images': False}),
+    'generate.md_images': (generators.Markdown, {'print_images': True}),
+    'generate.adoc': (generators.Asciidoc, {'print_images': False}),
+    'generate.adoc_images': (generators.Asciidoc, {'print_images': True}),
+}
+
+# Register map file formats: extension -> generator to create the file
+FORMATS = {
+    'json': generators.Json,
+    'yaml': generators.Yaml,
+    'txt': generators.Txt,
+}
+
+
+def measure(func, repeat, memory=True):
+    """Run function several times to get the best wall time, then once more under tracemalloc to get
+    peak memory. Return the best time, the peak memory and the last result of the function."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    if not memory:
+        return min(times), None, result
+    tracemalloc.start()
+    try:
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(times), peak, result
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--regs', type=int, default=1000, help='number of registers (default is 1000)')
+    parser.add_argument('--bitfields', type=int, default=4, help='number of bit fields per register (default is 4)')
+    parser.add_argument('--enums', type=int, default=4, help='maximum number of enums per bit field (default is 4)')
+    parser.add_argument('--seed', type=int, default=1, help='seed of the register map generator (default is 1)')
+    parser.add_argument('--repeat', type=int, default=1, help='number of runs to get the best time (default is 1)')
+    parser.add_argument('--no-memory', action='store_false', dest='memory',
+                        help='do not measure peak memory, which makes the benchmark several times faster')
+    parser.add_argument('--phases', help='run only phases which names contain one of the comma separated strings')
+    parser.add_argument('-o', '--output', help='write results to the file instead of stdout')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    selected = [s.strip() for s in args.phases.split(',')] if args.phases else None
+    results = []
+
+    def run_phase(name, func):
+        if selected and not any(s in name for s in selected):
+            return None
+        print("... %s" % name, file=sys.stderr)
+        wall_time, peak_memory, result = measure(func, args.repeat, args.memory)
+        results.append({'name': name, 'time': wall_time, 'peak_memory': peak_memory})
+        return result
+
+    corsair.config.set_globcfg(corsair.config.default_globcfg())
+    data_width = corsair.config.get_globcfg()['data_width']
+    workdir = Path(tempfile.mkdtemp(prefix='corsair_bench'))
+    try:
+        rmap = run_phase('synth', lambda: synth_regmap(args.regs, args.bitfields, args.enums, data_width, args.seed))
+        if rmap is None:
+            rmap = synth_regmap(args.regs, args.bitfields, args.enums, data_width, args.seed)
+
+        # read register map files of all formats
+        for ext, gen_cls in FORMATS.items():
+            # text table allows only one field per register
+            file_rmap = rmap if ext != 'txt' else synth_regmap(args.regs, 1, args.enums, data_width, args.seed)
+            path = str(workdir / ('regs.%s' % ext))
+            gen_cls(file_rmap, path).generate()
+            run_phase('read.%s' % ext, lambda: RegisterMap().read_file(path))
+            if ext != 'txt':
+                run_phase('read.%s_stream' % ext, lambda: RegisterMap().read_file(path, stream=True))
+
+        # the map is changed every time to force the whole validation
+        def validate():
+            rmap[0].description = rmap[0].description
+            rmap.validate()
+        run_phase('validate', validate)
+
+        # generators are run in a fresh directory every time, so output files are always written
+        for name, (gen_cls, params) in GENERATORS.items():
+            def generate():
+                outdir = Path(tempfile.mkdtemp(dir=str(workdir)))
+                generators._wavedrom_svgs.clear()
+                gen_cls(rmap, str(outdir / name), **params).generate()
+            run_phase(name, generate)
+    finally:
+        shutil.rmtree(str(workdir), ignore_errors=True)
+
+    report = {
+        'corsair_version': corsair.__version__,
+        'python_version': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {
+            'regs': args.regs,
+            'bitfields': args.bitfields,
+            'enums': args.enums,
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'phases': results,
+    }
+    report_str = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report_str + '\n')
+    else:
+        print(report_str)
+
+
+if __name__ == '__main__':
+    main()
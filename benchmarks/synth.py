@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Synthetic register maps of any size.
+"""
+
+import random
+from corsair import EnumValue, BitField, Register, RegisterMap
+
+# Access and hardware modes of the fields, in the same mix as in `corsair.utils.create_template`
+FIELD_MODES = [
+    ('rw', 'o'),
+    ('rw', 'oie'),
+    ('rw', 'q'),
+    ('rw', 'n'),
+    ('ro', 'i'),
+    ('ro', 'ie'),
+    ('ro', 'f'),
+    ('rolh', 'i'),
+    ('roll', 'i'),
+    ('roc', 'i'),
+    ('rw1c', 's'),
+    ('rw1s', 'c'),
+    ('wo', 'o'),
+    ('wosc', 'o'),
+]
+
+
+def synth_regmap(regs_num=1000, bitfields_num=4, enums_num=4, data_width=32, seed=1):
+    """Create a register map with random fields.
+
+    :param regs_num: Number of registers
+    :param bitfields_num: Number of bit fields per register
+    :param enums_num: Maximum number of enums per bit field. Fields narrower than 2 bits have no enums.
+    :param data_width: Width of the registers. Has to be equal to 'data_width' of the global configuration.
+    :param seed: Seed for the random generator, the same seed gives the same register map
+    """
+    assert 0 < bitfields_num <= data_width, \
+        "Number of bit fields %d doesn't fit into %d bit register!" % (bitfields_num, data_width)
+    rnd = random.Random(seed)
+    slot = data_width // bitfields_num
+    regs = []
+    for i in range(regs_num):
+        reg = Register('REG%d' % i, 'Register %d' % i, i * data_width // 8)
+        for j in range(bitfields_num):
+            access, hardware = rnd.choice(FIELD_MODES)
+            width = rnd.randint(1, slot)
+            bf = BitField('BF%d' % j, 'Bit field %d of register %d' % (j, i),
+                          reset=rnd.getrandbits(width) if hardware != 'q' else 0,
+                          width=width, lsb=j * slot, access=access, hardware=hardware)
+            if width > 1:
+                bf.add_enums([EnumValue('E%d' % k, k, 'Enum %d' % k) for k in range(min(enums_num, 2**width))])
+            reg.add_bitfields(bf)
+        regs.append(reg)
+    rmap = RegisterMap()
+    rmap.add_registers_bulk(regs)
+    return rmap
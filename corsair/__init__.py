@@ -14,6 +14,7 @@ except (ImportError, ModuleNotFoundError) as e:
     __version__ = 'git-latest'
 
 from . import config
+from . import cache
 from .enum import EnumValue
 from .bitfield import BitField
 from .reg import Register
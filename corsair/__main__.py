@@ -6,11 +6,19 @@
 
 import sys
 import os
+import io
+import glob
+import json
+import stat
+import time
 import argparse
+import threading
+import traceback
+import tracemalloc
 from pathlib import Path
 import corsair
 from . import utils
-from contextlib import contextmanager
+from contextlib import contextmanager, redirect_stdout, redirect_stderr
 import importlib.util
 
 __all__ = ['main']
@@ -34,18 +42,20 @@ class ArgumentParser(argparse.ArgumentParser):
         self.exit(2, '\n%s: error: %s\n' % (self.prog, message))
 
 
-def parse_arguments():
-    """Parse and validate arguments."""
+def parse_arguments(argv=None, **defaults):
+    """Parse and validate arguments. Arguments are taken from `sys.argv` if no list provided.
+    Keyword arguments override default values of the options."""
     parser = ArgumentParser(prog=corsair.__title__,
                             description=corsair.__description__)
     parser.add_argument('-v', '--version',
                         action='version',
                         version='%(prog)s v' + corsair.__version__)
     parser.add_argument(metavar='WORKDIR',
-                        nargs='?',
-                        dest='workdir_path',
-                        default=os.getcwd(),
-                        help='working directory (default is the current directory)')
+                        nargs='*',
+                        dest='workdir_paths',
+                        default=[os.getcwd()],
+                        help='working directories, configuration files or glob patterns of them '
+                             '(default is the current directory)')
     parser.add_argument('-r',
                         metavar='REGMAP',
                         dest='regmap_path',
@@ -60,7 +70,65 @@ def parse_arguments():
                         choices=template_choices,
                         dest='template_format',
                         help='create templates (choose from %s)' % ', '.join(template_choices))
-    return parser.parse_args()
+    parser.add_argument('--cache-dir',
+                        metavar='DIR',
+                        dest='cache_dir',
+                        default=os.environ.get('CORSAIR_CACHE_DIR'),
+                        help='enable persistent cache in the directory (default is $CORSAIR_CACHE_DIR if set)')
+    parser.add_argument('--cache-size',
+                        metavar='MB',
+                        type=int,
+                        dest='cache_size',
+                        default=256,
+                        help='size limit of the persistent cache in megabytes (default is 256)')
+    parser.add_argument('-j', '--jobs',
+                        metavar='N',
+                        type=int,
+                        dest='jobs',
+                        default=1,
+                        help='number of targets (or projects, if many are given) to make in parallel (default is 1)')
+    parser.add_argument('--targets',
+                        metavar='NAMES',
+                        dest='targets',
+                        help='make only targets from the comma separated list')
+    parser.add_argument('--force',
+                        action='store_true',
+                        dest='force',
+                        help='make all targets even if they are up to date')
+    parser.add_argument('--dry-run',
+                        action='store_true',
+                        dest='dry_run',
+                        help='only show which targets would be made')
+    parser.add_argument('--profile',
+                        action='store_true',
+                        dest='profile',
+                        help='print wall time and peak memory of every phase and target (makes corsair slower)')
+    parser.add_argument('--profile-out',
+                        metavar='FILE',
+                        dest='profile_out',
+                        help='enable --profile and save cProfile statistics of the main process to the file')
+    parser.add_argument('--report',
+                        metavar='FILE',
+                        dest='report',
+                        help='save JSON report with the results of every target to the file')
+    parser.add_argument('--events',
+                        action='store_true',
+                        dest='events',
+                        help='print build events to stdout as JSON lines, other messages are printed to stderr')
+    parser.add_argument('--watch',
+                        action='store_true',
+                        dest='watch',
+                        help='keep running and make targets again every time files they depend on are changed')
+    parser.add_argument('--serve',
+                        metavar='SOCKET',
+                        dest='serve',
+                        help='keep running and make targets for the clients connected to the Unix socket')
+    parser.add_argument('--connect',
+                        metavar='SOCKET',
+                        dest='connect',
+                        help='pass all other arguments to the corsair server listening on the Unix socket')
+    parser.set_defaults(**defaults)
+    return parser.parse_args(argv)
 
 
 def generate_templates(format):
@@ -117,7 +185,287 @@ def finish():
     exit(0)
 
 
-def app(args):
+def get_generator(gen_spec):
+    """Get generator name and class by its name or by a path to custom module in form `path/to/module.py::Class`."""
+    if '.py::' in gen_spec:
+        custom_module_path, custom_generator_name = gen_spec.split('::')
+        custom_module_name = utils.get_file_name(custom_module_path)
+        spec = importlib.util.spec_from_file_location(custom_module_name, custom_module_path)
+        custom_module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(custom_module)
+        try:
+            return custom_generator_name, getattr(custom_module, custom_generator_name)
+        except AttributeError:
+            raise ValueError("Generator '%s' from module '%s' does not exist!" %
+                             (custom_generator_name, custom_module_path))
+    else:
+        try:
+            return gen_spec, getattr(corsair.generators, gen_spec)
+        except AttributeError:
+            raise ValueError("Generator '%s' does not exist!" % gen_spec)
+
+
+# list of profiled phases: (name, wall time in seconds, peak memory in bytes), None if profiling is disabled
+_profile = None
+
+
+def start_profile():
+    """Enable profiling of the phases."""
+    global _profile
+    _profile = []
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def stop_profile():
+    """Disable profiling of the phases."""
+    global _profile
+    if _profile is not None:
+        _profile = None
+        tracemalloc.stop()
+
+
+@contextmanager
+def profile_phase(name):
+    """Measure wall time and peak memory of the code inside the context, if profiling is enabled."""
+    if _profile is None:
+        yield
+        return
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.clear_traces()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        _profile.append((name, time.perf_counter() - start_time, tracemalloc.get_traced_memory()[1] - start_memory))
+
+
+def print_profile():
+    """Print profiled phases sorted by wall time."""
+    if _profile is None:
+        return
+    print("... profile:")
+    print("    %10s  %12s  %s" % ('time, s', 'memory, MiB', 'phase'))
+    for name, wall_time, peak_memory in sorted(_profile, key=lambda p: p[1], reverse=True):
+        print("    %10.3f  %12.2f  %s" % (wall_time, peak_memory / 2**20, name))
+
+
+# build report, None if it is disabled
+_report = None
+# stream to print build events as JSON lines, None if events are disabled
+_events = None
+
+
+def report_event(event, **data):
+    """Save event to the build report and print it as a JSON line, if they are enabled."""
+    if _report is not None:
+        if event == 'target':
+            _report['targets'].append(data)
+        else:
+            _report[event] = data
+    if _events is not None:
+        print(json.dumps(dict(event=event, **data)), file=_events, flush=True)
+
+
+def cache_stats_diff(before):
+    """Get statistics of the cache use since the snapshot was taken."""
+    diff = {}
+    for name, stats in corsair.cache.stats.items():
+        old = before.get(name, {})
+        stats = {k: v - old.get(k, 0) for k, v in stats.items()}
+        if any(stats.values()):
+            diff[name] = stats
+    return diff
+
+
+def make_target(name, gen_name, gen_obj, rmap, target):
+    """Make target and return its record for the build report."""
+    cache_stats = {k: dict(v) for k, v in corsair.cache.stats.items()}
+    start_time = time.perf_counter()
+    with profile_phase("make '%s'" % name):
+        gen = gen_obj(rmap, **target)
+        gen.generate()
+    duration = time.perf_counter() - start_time
+    # custom generators may write files on their own
+    outputs = getattr(gen, 'outputs', None) or ({target['path']: None} if 'path' in target.keys() else {})
+    outputs = [{'path': path, 'bytes': os.path.getsize(path) if os.path.isfile(path) else 0, 'changed': changed}
+               for path, changed in outputs.items()]
+    return {
+        'target': name,
+        'generator': gen_name,
+        'status': 'made',
+        'duration': duration,
+        'outputs': outputs,
+        'bytes_written': sum(o['bytes'] for o in outputs if o['changed'] is not False),
+        'changed': any(o['changed'] is not False for o in outputs),
+        'cache': cache_stats_diff(cache_stats),
+    }
+
+
+def _init_worker():
+    # targets are already made in parallel
+    corsair.generators.Wavedrom.draw_jobs = 1
+
+
+def _make_target_worker(name, target, rmap, settings):
+    """Make target inside a worker process with the settings of the main process.
+    Return console output to be printed by the main process, profiled phases and record for the build report."""
+    # worker can be reused for other working directories, e.g. by the server
+    os.chdir(settings['workdir'])
+    corsair.config.set_globcfg(settings['globcfg'])
+    corsair.cache.set_cache(settings['cache_dir'], settings['cache_size_limit'])
+    if settings['profile']:
+        start_profile()
+    else:
+        stop_profile()
+    gen_name, gen_obj = get_generator(target['generator'])
+    with redirect_stdout(io.StringIO()) as output:
+        record = make_target(name, gen_name, gen_obj, rmap, target)
+    return output.getvalue(), _profile, record
+
+
+def create_pool(jobs):
+    """Create pool of worker processes to make targets."""
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker)
+
+
+# file inside working directory to save stamps of the targets made
+STAMPS_PATH = '.corsair_stamps'
+
+
+def hash_templates(path, pattern='**/*.j2'):
+    """Calculate hash of all the templates inside the directory."""
+    files = sorted(p for p in Path(path).glob(pattern) if p.is_file())
+    return corsair.cache.hash_data([[str(p.relative_to(path)), corsair.cache.hash_file(p)] for p in files])
+
+
+def target_stamp(target, regmap_hash):
+    """Calculate stamp of the target. Target has to be made again when its stamp is changed."""
+    deps = {
+        'version': corsair.__version__,
+        'globcfg': corsair.config.get_globcfg(),
+        'regmap': regmap_hash,
+        'target': target,
+        'templates': [hash_templates(str(Path(corsair.generators.__file__).parent / 'templates'))],
+    }
+    if 'templates_path' in target.keys():
+        deps['templates'].append(hash_templates(str(Path(target['templates_path']).absolute())))
+    if '.py::' in target.get('generator', ''):
+        # custom generator usually keeps its templates next to the module
+        custom_module_path = Path(target['generator'].split('::')[0]).absolute()
+        try:
+            deps['module'] = corsair.cache.hash_file(custom_module_path)
+        except OSError:
+            deps['module'] = None
+        deps['templates'].append(hash_templates(str(custom_module_path.parent), '*.j2'))
+    return corsair.cache.hash_data(deps)
+
+
+def target_deps(target):
+    """Get files target depends on besides the register map and the configuration file.
+    Return list of (path, pattern) pairs, where pattern is used to find files if path is a directory."""
+    deps = []
+    if 'templates_path' in target.keys():
+        deps.append((Path(target['templates_path']), '**/*'))
+    if '.py::' in target.get('generator', ''):
+        custom_module_path = Path(target['generator'].split('::')[0])
+        deps.append((custom_module_path, None))
+        deps.append((custom_module_path.parent, '*.j2'))
+    return deps
+
+
+def is_up_to_date(stamp, new_stamp):
+    """Check if the target saved with the stamp has the new stamp and all its output files still exist."""
+    if not isinstance(stamp, dict) or stamp.get('stamp') != new_stamp:
+        return False
+    return all(Path(path).exists() for path in stamp.get('outputs', []))
+
+
+def read_stamps(config_path):
+    """Read stamps of the targets made with the configuration file.
+    Every stamp is saved together with the list of the output files of the target."""
+    try:
+        with open(STAMPS_PATH, 'r') as f:
+            return json.load(f).get(str(config_path), {})
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def write_stamps(config_path, stamps):
+    """Save stamps of the targets made with the configuration file."""
+    try:
+        with open(STAMPS_PATH, 'r') as f:
+            all_stamps = json.load(f)
+        assert isinstance(all_stamps, dict)
+    except (OSError, ValueError, AssertionError):
+        all_stamps = {}
+    all_stamps[str(config_path)] = stamps
+    corsair.generators.write_file(STAMPS_PATH, json.dumps(all_stamps, indent=4, sort_keys=True))
+
+
+def make_targets(rmap, targets, jobs=1, pool=None):
+    """Make targets one by one or in parallel with a pool of worker processes.
+    New pool is created if no pool provided. Return records of the targets made, see :func:`make_target`."""
+    # find all the generators beforehand to report errors before any work is done
+    generators = {}
+    for t in targets:
+        if 'generator' not in targets[t].keys():
+            die("No generator was specified for the target '%s'!" % t)
+        try:
+            generators[t] = get_generator(targets[t]['generator'])
+        except ValueError as e:
+            die(e)
+
+    records = {}
+    if jobs > 1 and len(targets) > 1:
+        if pool is None:
+            with create_pool(min(jobs, len(targets))) as pool:
+                return make_targets(rmap, targets, jobs, pool)
+        settings = {
+            'workdir': os.getcwd(),
+            'globcfg': corsair.config.get_globcfg(),
+            'cache_dir': corsair.cache.cache_dir,
+            'cache_size_limit': corsair.cache.cache_size_limit,
+            'profile': _profile is not None,
+        }
+        futures = {t: pool.submit(_make_target_worker, t, targets[t], rmap, settings) for t in targets}
+        # report in the same order as targets are listed
+        for t in targets:
+            print("... make '%s': %s -> '%s': " % (t, generators[t][0], targets[t]['path']))
+            try:
+                output, profile, record = futures[t].result()
+            except Exception as e:
+                report_event('target', target=t, generator=generators[t][0], status='failed', message=str(e))
+                raise
+            print(output, end='')
+            if _profile is not None:
+                _profile.extend(profile)
+            report_event('target', **record)
+            records[t] = record
+    else:
+        for t in targets:
+            gen_name, gen_obj = generators[t]
+            print("... make '%s': %s -> '%s': " % (t, gen_name, targets[t]['path']))
+            try:
+                record = make_target(t, gen_name, gen_obj, rmap, targets[t])
+            except Exception as e:
+                report_event('target', target=t, generator=gen_name, status='failed', message=str(e))
+                raise
+            report_event('target', **record)
+            records[t] = record
+    return records
+
+
+# register map read by the last build: (key, register map)
+_last_rmap = (None, None)
+
+
+def app(args, pool=None):
+    """Make targets. Return files they depend on, see :func:`target_deps`."""
     print("... set working directory '%s'" % args.workdir_path)
 
     # check if teplates are needed
@@ -135,7 +483,9 @@ def app(args):
         die("Can't find configuration file '%s'!" % config_path)
     # try to read it
     print("... read configuration file '%s'" % config_path)
-    globcfg, targets = corsair.config.read_csrconfig(config_path)
+    with profile_phase('read configuration'):
+        globcfg, targets = corsair.config.read_csrconfig(config_path)
+    report_event('config', path=str(config_path))
 
     # check if regiter map file path was provided
     if args.regmap_path:
@@ -147,61 +497,426 @@ def app(args):
         regmap_path = None
         print("Warning: No register map file was specified!")
     corsair.config.set_globcfg(globcfg)
+    # check it existance
+    if regmap_path and not regmap_path.is_file():
+        die("Can't find register map file '%s'!" % regmap_path)
 
-    if regmap_path:
-        # check it existance
-        if not regmap_path.is_file():
-            die("Can't find register map file '%s'!" % regmap_path)
+    # select targets
+    if not targets:
+        die("No targets were specified! Nothing to do!")
+    if args.targets:
+        selected = [t.strip() for t in args.targets.split(',') if t.strip()]
+        unknown = [t for t in selected if t not in targets]
+        if unknown:
+            die("Unknown target(s): %s!" % ', '.join(unknown))
+        targets = {t: targets[t] for t in targets if t in selected}
+    deps = [(config_path, None)] + ([(regmap_path, None)] if regmap_path else [])
+    for t in targets:
+        deps += target_deps(targets[t])
+
+    # skip targets which are up to date
+    with profile_phase('check stamps'):
+        stamps = read_stamps(config_path)
+        regmap_hash = corsair.cache.hash_file(regmap_path) if regmap_path else None
+        new_stamps = {t: target_stamp(targets[t], regmap_hash) for t in targets}
+    outdated = {}
+    for t in targets:
+        if args.force or not is_up_to_date(stamps.get(t), new_stamps[t]):
+            outdated[t] = targets[t]
+        else:
+            print("... skip '%s': up to date" % t)
+            report_event('target', target=t, generator=targets[t].get('generator'), status='skipped')
+    if args.dry_run:
+        for t in outdated:
+            print("... would make '%s': %s -> '%s'" % (t, outdated[t].get('generator'), outdated[t].get('path')))
+            report_event('target', target=t, generator=outdated[t].get('generator'), status='outdated')
+        return deps
+    if not outdated:
+        return deps
+
+    global _last_rmap
+    rmap_key = corsair.cache.hash_data([regmap_hash, corsair.config.get_globcfg()])
+    if regmap_path and _last_rmap[0] == rmap_key:
+        # the same register map was read by the previous build of this process
+        rmap = _last_rmap[1]
+    elif regmap_path:
         # try to read it
         print("... read register map file '%s'" % regmap_path)
         rmap = corsair.RegisterMap()
-        rmap.read_file(regmap_path)
+        cache_stats = {k: dict(v) for k, v in corsair.cache.stats.items()}
+        start_time = time.perf_counter()
+        with profile_phase('read register map'):
+            rmap.read_file(regmap_path)
+        report_event('regmap', path=str(regmap_path), duration=time.perf_counter() - start_time,
+                     cache=cache_stats_diff(cache_stats))
         print("... validate register map")
-        rmap.validate()
+        with profile_phase('validate register map'):
+            try:
+                rmap.validate()
+            except AssertionError as e:
+                report_event('validation', status='failed', message=str(e))
+                raise
+        report_event('validation', status='passed')
+        _last_rmap = (rmap_key, rmap)
     else:
         rmap = None
 
     # make targets
-    if not targets:
-        die("No targets were specified! Nothing to do!")
-    for t in targets:
-        print("... make '%s': " % t, end='')
-        if 'generator' not in targets[t].keys():
-            die("No generator was specified for the target!")
-
-        if '.py::' in targets[t]['generator']:
-            custom_module_path, custom_generator_name = targets[t]['generator'].split('::')
-            custom_module_name = utils.get_file_name(custom_module_path)
-            spec = importlib.util.spec_from_file_location(custom_module_name, custom_module_path)
-            custom_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(custom_module)
-            try:
-                gen_obj = getattr(custom_module, custom_generator_name)
-                gen_name = custom_generator_name
-            except AttributeError:
-                die("Generator '%s' from module '%s' does not exist!" % (custom_generator_name, custom_module_path))
+    records = make_targets(rmap, outdated, args.jobs, pool)
+    stamps.update({t: {'stamp': new_stamps[t], 'outputs': [o['path'] for o in records[t]['outputs']]}
+                   for t in outdated})
+    write_stamps(config_path, stamps)
+    return deps
+
+
+def build(args, pool=None):
+    """Make targets inside working directory and save the build report. Return files targets depend on."""
+    global _report
+    if args.report:
+        _report = {'corsair_version': corsair.__version__, 'targets': []}
+    start_time = time.perf_counter()
+    status = 'failed'
+    try:
+        with cwd(args.workdir_path):
+            deps = app(args, pool)
+        status = 'success'
+        return deps
+    except SystemExit as e:
+        if not e.code:
+            status = 'success'
+        raise
+    finally:
+        report_event('finish', workdir=args.workdir_path, status=status, duration=time.perf_counter() - start_time)
+        if args.report:
+            corsair.generators.write_file(args.report, json.dumps(_report, indent=4))
+
+
+def find_projects(paths, config_path=None):
+    """Find projects to build. Every path is a working directory, a configuration file or a glob pattern of them.
+    Directories matched by a pattern are used only if they contain the configuration file.
+    Return list of unique projects: (absolute path to working directory, path to configuration file)."""
+    config_path = config_path or 'csrconfig'
+    projects = []
+    for path in paths:
+        if glob.has_magic(path):
+            matches = sorted(glob.glob(path, recursive=True))
+            matches = [m for m in matches if os.path.isfile(m) or
+                       os.path.isfile(os.path.join(m, config_path))]
+            if not matches:
+                die("No projects match the pattern '%s'!" % path)
+        elif not os.path.exists(path):
+            die("Can't find working directory or configuration file '%s'!" % path)
         else:
-            gen_name = targets[t]['generator']
+            matches = [path]
+        for m in matches:
+            m = Path(m).absolute()
+            project = (str(m.parent), m.name) if m.is_file() else (str(m), config_path)
+            if project not in projects:
+                projects.append(project)
+    return projects
+
+
+def build_project(args, workdir_path, config_path):
+    """Make targets of one project from the batch. Errors are printed, not raised. Return record for the summary."""
+    global _report
+    project_args = argparse.Namespace(**vars(args))
+    project_args.workdir_path = workdir_path
+    project_args.config_path = config_path
+    project_args.report = None
+    # projects are already built in parallel
+    project_args.jobs = 1
+    _report = {'targets': []}
+    try:
+        build(project_args)
+    except SystemExit:
+        pass
+    except Exception as e:
+        print(''.join(traceback.format_exception_only(type(e), e)), end='')
+    record = {
+        'workdir': workdir_path,
+        'config': config_path,
+        'status': _report['finish']['status'],
+        'duration': _report['finish']['duration'],
+        'targets': _report['targets'],
+    }
+    _report = None
+    return record
+
+
+def _build_project_worker(args, workdir_path, config_path, settings):
+    """Make targets of one project inside a worker process with the settings of the main process.
+    Return console output and events to be printed by the main process, profiled phases and project record."""
+    global _events
+    corsair.cache.set_cache(settings['cache_dir'], settings['cache_size_limit'])
+    if settings['profile']:
+        start_profile()
+    else:
+        stop_profile()
+    _events = io.StringIO() if settings['events'] else None
+    with redirect_stdout(io.StringIO()) as output:
+        record = build_project(args, workdir_path, config_path)
+    events = _events.getvalue() if _events else ''
+    _events = None
+    return output.getvalue(), events, _profile, record
+
+
+def build_batch(args, projects, pool=None):
+    """Make targets of many projects one by one or in parallel, then print summary and save the build report."""
+    records = []
+    if args.jobs > 1:
+        if pool is None:
+            with create_pool(min(args.jobs, len(projects))) as pool:
+                return build_batch(args, projects, pool)
+        settings = {
+            'cache_dir': corsair.cache.cache_dir,
+            'cache_size_limit': corsair.cache.cache_size_limit,
+            'profile': _profile is not None,
+            'events': _events is not None,
+        }
+        futures = [pool.submit(_build_project_worker, args, workdir_path, config_path, settings)
+                   for workdir_path, config_path in projects]
+        # report in the same order as projects are listed
+        for f in futures:
+            output, events, profile, record = f.result()
+            print(output, end='')
+            if _events is not None:
+                _events.write(events)
+                _events.flush()
+            if _profile is not None:
+                _profile.extend(profile)
+            records.append(record)
+    else:
+        for workdir_path, config_path in projects:
+            records.append(build_project(args, workdir_path, config_path))
+
+    # aggregate results
+    failed = [r for r in records if r['status'] != 'success']
+    targets = [t for r in records for t in r['targets']]
+    summary = {
+        'projects': len(records),
+        'failed': len(failed),
+        'made': len([t for t in targets if t['status'] == 'made']),
+        'skipped': len([t for t in targets if t['status'] == 'skipped']),
+        'duration': sum(r['duration'] for r in records),
+    }
+    print("... summary: %d projects (%d failed), %d targets made, %d skipped" %
+          (summary['projects'], summary['failed'], summary['made'], summary['skipped']))
+    for r in failed:
+        print("    failed: '%s'" % str(Path(r['workdir']) / r['config']))
+    report_event('summary', **summary)
+    if args.report:
+        report = {'corsair_version': corsair.__version__, 'projects': records, 'summary': summary}
+        corsair.generators.write_file(args.report, json.dumps(report, indent=4))
+    if failed:
+        die("%d of %d projects failed!" % (summary['failed'], summary['projects']))
+
+
+# seconds between checks of the files in watch mode
+WATCH_INTERVAL = 0.5
+
+
+def deps_snapshot(deps):
+    """Get modification time and size of every file from the list returned by :func:`target_deps`."""
+    snapshot = {}
+    for path, pattern in deps:
+        paths = [path]
+        if pattern and path.is_dir():
+            paths += sorted(path.glob(pattern))
+        for p in paths:
             try:
-                gen_obj = getattr(corsair.generators, gen_name)
-            except AttributeError:
-                die("Generator '%s' does not exist!" % gen_name)
-
-        gen_args = targets[t]
-        print("%s -> '%s': " % (gen_name, gen_args['path']))
-        gen_obj(rmap, **gen_args).generate()
+                file_stat = p.stat()
+                snapshot[str(p)] = (file_stat.st_mtime_ns, file_stat.st_size)
+            except OSError:
+                snapshot[str(p)] = None
+    return snapshot
+
+
+def watch(args, pool=None):
+    """Make targets every time files they depend on are changed. Stop on Ctrl+C."""
+    own_pool = pool is None and args.jobs > 1
+    if own_pool:
+        pool = create_pool(args.jobs)
+    deps = [(Path(args.config_path or 'csrconfig'), None)]
+    try:
+        while True:
+            try:
+                deps = build(args, pool) or deps
+            except (Exception, SystemExit) as e:
+                # keep watching, the error can be fixed
+                if not isinstance(e, SystemExit):
+                    print(''.join(traceback.format_exception_only(type(e), e)), end='')
+            with cwd(args.workdir_path):
+                snapshot = deps_snapshot(deps)
+            if _profile is not None:
+                print_profile()
+                del _profile[:]
+            print("... watch for changes (press Ctrl+C to stop)", flush=True)
+            with cwd(args.workdir_path):
+                while deps_snapshot(deps) == snapshot:
+                    time.sleep(WATCH_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if own_pool:
+            pool.shutdown()
+
+
+def serve(args):
+    """Make targets for the clients connected to the Unix socket. Stop on Ctrl+C.
+
+    Client sends a JSON line with its working directory and command line arguments: `{"cwd": str, "argv": list}`.
+    Server replies with a JSON line with the console output and the exit code:
+    `{"stdout": str, "stderr": str, "code": int}`. Requests are served one by one, as the build changes
+    the current directory and other process-wide state, but all of them share one warm process.
+    """
+    import socketserver
+    if not hasattr(socketserver, 'ThreadingUnixStreamServer'):
+        die("Unix sockets are not supported on this platform!")
+    pool = create_pool(args.jobs) if args.jobs > 1 else None
+    lock = threading.Lock()
+
+    class RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            request = json.loads(self.rfile.readline().decode())
+            stdout, stderr = io.StringIO(), io.StringIO()
+            with lock, cwd(request['cwd']), redirect_stdout(stdout), redirect_stderr(stderr):
+                code = 0
+                try:
+                    # number of jobs of the server is used if client doesn't specify it
+                    req_args = parse_arguments(request['argv'], jobs=args.jobs)
+                    if req_args.watch or req_args.serve or req_args.connect:
+                        print("Options --watch, --serve and --connect can't be passed to the server!", file=sys.stderr)
+                        code = 2
+                    else:
+                        run(req_args, pool)
+                except SystemExit as e:
+                    code = e.code if isinstance(e.code, int) else 1
+                except Exception:
+                    traceback.print_exc()
+                    code = 1
+            response = {'stdout': stdout.getvalue(), 'stderr': stderr.getvalue(), 'code': code}
+            self.wfile.write((json.dumps(response) + '\n').encode())
+
+    socket_path = str(Path(args.serve).absolute())
+    if os.path.lexists(socket_path):
+        # remove socket left by the server which was not stopped properly
+        if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+            die("Can't serve on '%s': file exists and it is not a socket!" % socket_path)
+        import socket
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(socket_path)
+            except OSError:
+                os.remove(socket_path)
+            else:
+                die("Can't serve on '%s': other server is already running!" % socket_path)
+    server = socketserver.ThreadingUnixStreamServer(socket_path, RequestHandler)
+    server.daemon_threads = True
+    print("... serve on '%s' (press Ctrl+C to stop)" % socket_path, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(socket_path)
+        if pool:
+            pool.shutdown()
+
+
+def connect(socket_path, argv):
+    """Pass arguments to the corsair server, print its output and exit with its exit code."""
+    import socket
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError as e:
+            die("Can't connect to corsair server '%s': %s" % (socket_path, e))
+        sock.sendall((json.dumps({'cwd': os.getcwd(), 'argv': argv}) + '\n').encode())
+        with sock.makefile('rb') as f:
+            response = json.loads(f.readline().decode())
+    sys.stdout.write(response['stdout'])
+    sys.stderr.write(response['stderr'])
+    sys.exit(response['code'])
+
+
+def client_argv(argv):
+    """Remove '--connect SOCKET' from the arguments."""
+    argv = list(argv)
+    for i, arg in enumerate(argv):
+        if arg == '--connect':
+            del argv[i:i + 2]
+            break
+        elif arg.startswith('--connect='):
+            del argv[i]
+            break
+    return argv
+
+
+def run(args, pool=None):
+    """Do everything requested by the parsed arguments."""
+    global _events, _report
+    _events = None
+    _report = None
+    stop_profile()
+
+    # setup cache before changing the working directory, as its path can be relative
+    corsair.cache.set_cache(args.cache_dir, args.cache_size * 2**20)
+
+    # setup profiling
+    profiler = None
+    if args.profile or args.profile_out:
+        start_profile()
+    if args.profile_out:
+        import cProfile
+        args.profile_out = str(Path(args.profile_out).absolute())
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    # setup build report and events
+    if args.report:
+        args.report = str(Path(args.report).absolute())
+    if args.events:
+        _events = sys.stdout
+
+    # messages for humans don't mix with events
+    with redirect_stdout(sys.stderr if args.events else sys.stdout):
+        projects = find_projects(args.workdir_paths, args.config_path)
+        try:
+            if len(projects) > 1:
+                if args.watch:
+                    die("Option --watch can be used only with one project!")
+                build_batch(args, projects, pool)
+            else:
+                # do all the things inside working directory
+                args.workdir_path, args.config_path = projects[0]
+                if args.watch:
+                    watch(args, pool)
+                else:
+                    build(args, pool)
+        finally:
+            if profiler:
+                profiler.disable()
+        if profiler:
+            profiler.dump_stats(args.profile_out)
+            print("... save profiler statistics to '%s'" % args.profile_out)
+        print_profile()
+        stop_profile()
+        finish()
 
 
 def main():
     """Program main"""
     # parse arguments
     args = parse_arguments()
-
-    # do all the things inside working directory
-    args.workdir_path = str(Path(args.workdir_path).absolute())
-    with cwd(args.workdir_path):
-        app(args)
-    finish()
+    if args.connect:
+        connect(args.connect, client_argv(sys.argv[1:]))
+    elif args.serve:
+        serve(args)
+    else:
+        # draw register images with all CPUs, as entry point of the worker processes is known
+        corsair.generators.Wavedrom.draw_jobs = None
+        run(args)
 
 
 if __name__ == '__main__':
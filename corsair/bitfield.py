@@ -27,6 +27,9 @@ class BitField():
     :type hardware: str
     """
 
+    __slots__ = ('_enums', '_name', '_names', '_description', '_reset', '_width', '_lsb', '_access', '_hardware',
+                 '_etc')
+
     def __init__(self, name='val', description='Value of the register', reset=0, width=1,
                  lsb=0, access='rw', hardware='n', **args):
         self._enums = []
@@ -38,7 +41,7 @@ class BitField():
         self.lsb = utils.str2int(lsb)
         self.access = access
         self.hardware = hardware
-        self.etc = args
+        self._etc = args or None
 
     def __eq__(self, other):
         if self.__class__ != other.__class__:
@@ -108,19 +111,45 @@ class BitField():
             'hardware': self.hardware,
             'enums': [enum.as_dict() for enum in self.enums]
         }
-        d.update(self.etc)
+        if self._etc:
+            d.update(self._etc)
         return d
 
+    def _name_variants(self):
+        # names are cached for the name case of the current configuration
+        name_case = config.get_globcfg()['force_name_case']
+        names = self._names
+        if names is None or names[0] != name_case:
+            names = self._names = utils.name_variants(self._name, name_case)
+        return names
+
     @property
     def name(self):
         """Name of the bit field."""
-        return utils.force_name_case(self._name)
+        return self._name_variants()[1]
 
     @name.setter
     def name(self, value):
         if not utils.is_str(value):
             raise ValueError("'name' attribute has to be 'str', but '%s' provided for the bitfield!" % type(value))
+        utils.model_version += 1
         self._name = value
+        self._names = None
+
+    @property
+    def name_lower(self):
+        """Name of the bit field in lowercase."""
+        return self._name_variants()[2]
+
+    @property
+    def name_upper(self):
+        """Name of the bit field in uppercase."""
+        return self._name_variants()[3]
+
+    @property
+    def name_capitalized(self):
+        """Name of the bit field with the first letter capitalized."""
+        return self._name_variants()[4]
 
     @property
     def description(self):
@@ -132,6 +161,7 @@ class BitField():
         if not utils.is_str(value):
             raise ValueError("'description' attribute has to be 'str', but '%s' provided for '%s' bitfield!" %
                              (type(value), self.name))
+        utils.model_version += 1
         self._description = value
 
     @property
@@ -141,6 +171,7 @@ class BitField():
 
     @reset.setter
     def reset(self, value):
+        utils.model_version += 1
         self._reset = utils.str2int(value)
 
     @property
@@ -150,6 +181,7 @@ class BitField():
 
     @lsb.setter
     def lsb(self, value):
+        utils.model_version += 1
         self._lsb = utils.str2int(value)
 
     @property
@@ -159,6 +191,7 @@ class BitField():
 
     @width.setter
     def width(self, value):
+        utils.model_version += 1
         self._width = utils.str2int(value)
 
     @property
@@ -171,6 +204,7 @@ class BitField():
         if not utils.is_str(value):
             raise ValueError("'access' attribute has to be 'str', but '%s' provided for '%s' bitfield!" %
                              (type(value), self.name))
+        utils.model_version += 1
         self._access = value
 
     @property
@@ -185,8 +219,20 @@ class BitField():
             if ch not in "iocselaqfn":
                 raise ValueError("Unknown attribute '%s' for 'hardware' property of the '%s' bitfield!" %
                                  (ch, self.name))
+        utils.model_version += 1
         self._hardware = value
 
+    @property
+    def etc(self):
+        """Dictionary with custom attributes of the bitfield."""
+        if self._etc is None:
+            self._etc = {}
+        return self._etc
+
+    @etc.setter
+    def etc(self, value):
+        self._etc = value
+
     @property
     def msb(self):
         """Position of most significant bit (MSB) of the field."""
@@ -245,6 +291,7 @@ class BitField():
             except StopIteration:
                 # when enum list is empty or all enum values are less than the current one
                 self._enums.append(enum)
+            utils.model_version += 1
         return self
 
     @property
@@ -255,7 +302,7 @@ class BitField():
     @property
     def mask(self):
         """Bit mask for the field."""
-        return ((2**(self.width) - 1) << self.lsb)
+        return ((1 << self.width) - 1) << self.lsb
 
     def is_vector(self):
         """Check if the width of the bit field > 1."""
@@ -299,11 +346,13 @@ class BitField():
                 "Hardware mode 'q' is allowed to use only with '%s'!" % (q_access_allowed)
 
         # enums
+        names_duplicates = utils.get_duplicates(self.enum_names)
+        values_duplicates = utils.get_duplicates(e.value for e in self)
         for enum in self.enums:
             assert enum.value.bit_length() <= self.width, \
                 "Enum '%s' value %d exceeds bitfield width %d!" % (enum.name, enum.value, self.width)
-            assert self.enum_names.count(enum.name) == 1, \
+            assert enum.name not in names_duplicates, \
                 "Enum '%s' name is not unique!" % (enum.name)
-            assert [e.value for e in self].count(enum.value) == 1, \
+            assert enum.value not in values_duplicates, \
                 "Enum '%s' value is not unique!" % (enum.value)
             enum.validate()
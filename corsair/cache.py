@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Persistent on-disk cache
+"""
+
+from corsair import __version__
+from . import config
+import os
+import json
+import hashlib
+from pathlib import Path
+
+# Bump it every time format of the cached data is changed
+CACHE_FORMAT = 1
+
+cache_dir = None
+cache_size_limit = 256 * 2**20
+
+# Statistics of the cache use: subdirectory name -> {'hits': number, 'misses': number}
+stats = {}
+
+
+def set_cache(path, size_limit=None):
+    """Use specified directory for the persistent cache. Cache is disabled if no path provided.
+
+    :param path: Path to the cache directory
+    :param size_limit: Maximum size of the cache in bytes. Least recently used entries are removed when it is exceeded
+    """
+    global cache_dir, cache_size_limit
+    cache_dir = Path(path).absolute() if path else None
+    if size_limit is not None:
+        cache_size_limit = size_limit
+
+
+def get_cache_dir(name):
+    """Get path to the cache subdirectory with the specified name. Returns None if cache is disabled."""
+    if not cache_dir:
+        return None
+    path = cache_dir / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def count(name, hit):
+    """Count hit or miss of the cache. Work saved by in-memory caches can be counted as well."""
+    name_stats = stats.setdefault(name, {'hits': 0, 'misses': 0})
+    name_stats['hits' if hit else 'misses'] += 1
+
+
+def hash_file(path):
+    """Calculate SHA-256 hash of the file content."""
+    h = hashlib.sha256()
+    with open(str(path), 'rb') as f:
+        for chunk in iter(lambda: f.read(2**20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_data(data):
+    """Calculate SHA-256 hash of the JSON serializable data."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def regmap_key(path):
+    """Create key for the register map file. It depends on the file content, the global configuration
+    and the corsair version."""
+    globcfg = config.get_globcfg()
+    globcfg = {k: globcfg[k] for k in config.default_globcfg().keys()}
+    return hash_data([CACHE_FORMAT, __version__, hash_file(path), globcfg])
+
+
+def load(name, key):
+    """Load object from the cache. Returns None if there is no such object in the cache."""
+    path = get_cache_dir(name)
+    if not path:
+        return None
+    import pickle
+    path = path / key
+    try:
+        with open(str(path), 'rb') as f:
+            obj = pickle.load(f)
+    except FileNotFoundError:
+        count(name, False)
+        return None
+    except Exception:
+        # damaged entry - forget about it
+        _remove(path)
+        count(name, False)
+        return None
+    count(name, True)
+    # update access time for the LRU eviction
+    try:
+        os.utime(str(path))
+    except OSError:
+        pass
+    return obj
+
+
+def store(name, key, obj, check_size=True):
+    """Save object to the cache. Least recently used entries are removed if the cache size limit is exceeded.
+
+    :param check_size: Check the cache size limit. Disable it to store many objects at once and call `evict()` after.
+    """
+    path = get_cache_dir(name)
+    if not path:
+        return
+    import pickle
+    try:
+        write_atomic(path / key, pickle.dumps(obj, pickle.HIGHEST_PROTOCOL))
+    except OSError:
+        return
+    if check_size:
+        evict()
+
+
+def write_atomic(path, data, mode=None, replace=None):
+    """Write bytes to the file via temporary file, so other processes never see a partially written file.
+
+    :param data: Bytes or iterable of bytes chunks
+    :param mode: Permission bits of the file. Permissions are set by umask as for open() if no mode provided
+    :param replace: Function called when all the data is written. The file is kept untouched if it returns False
+    :return: True if the file was replaced
+    """
+    # unlike tempfile.mkstemp(), umask is applied to the new file by the system
+    while True:
+        tmp_path = os.path.join(str(Path(path).parent), '.tmp' + os.urandom(8).hex())
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if isinstance(data, bytes):
+                f.write(data)
+            else:
+                for chunk in data:
+                    f.write(chunk)
+        if replace is not None and not replace():
+            _remove(tmp_path)
+            return False
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        os.replace(tmp_path, str(path))
+        return True
+    except BaseException:
+        _remove(tmp_path)
+        raise
+
+
+def evict():
+    """Remove least recently used files until the cache fits into the size limit."""
+    if not cache_dir or not cache_dir.is_dir():
+        return
+    entries = []
+    total_size = 0
+    for root, _, files in os.walk(str(cache_dir)):
+        for file in files:
+            path = os.path.join(root, file)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total_size <= cache_size_limit:
+            break
+        _remove(path)
+        total_size -= size
+
+
+def _remove(path):
+    try:
+        os.remove(str(path))
+    except OSError:
+        pass
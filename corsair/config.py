@@ -6,6 +6,8 @@
 
 from . import utils
 import configparser
+import contextvars
+from contextlib import contextmanager
 
 
 def default_globcfg():
@@ -62,8 +64,18 @@ def write_csrconfig(cfgpath, globcfg, targets):
     cfg.write(open(cfgpath, 'w'))
 
 
+# Types and values of the last configuration passed validation
+_valid_globcfg = None
+
+
 def validate_globcfg(globcfg):
     """Validate a dictionary with global configuration."""
+    global _valid_globcfg
+    # values of different types can be equal, e.g. 32 and 32.0, but only some types are valid
+    typed_globcfg = {k: (type(v), v) for k, v in globcfg.items()}
+    if typed_globcfg == _valid_globcfg:
+        return
+
     # base_address
     assert utils.is_non_neg_int(globcfg["base_address"]), \
         "Wrong value for 'base_address'='%s'. Must be a non negative integer." % globcfg["base_address"]
@@ -110,12 +122,42 @@ def validate_globcfg(globcfg):
         "Wrong value for 'force_name_case'='%s'. Must be one of this: %s." % (globcfg["force_name_case"],
                                                                               force_name_case_allowed)
 
+    _valid_globcfg = typed_globcfg
+
 
+# Global configuration by default, used outside of :func:`use_globcfg` contexts
 globcfg = default_globcfg()
 
+# Global configuration of the current context, see :func:`use_globcfg`
+_context_globcfg = contextvars.ContextVar('globcfg')
+
 
 def set_globcfg(globcfg_):
-    """Use specified global configuration for all operations"""
+    """Use specified global configuration for all operations outside of :func:`use_globcfg` contexts"""
     global globcfg
     validate_globcfg(globcfg_)
     globcfg = globcfg_
+
+
+def get_globcfg():
+    """Get global configuration of the current context or global configuration by default."""
+    return _context_globcfg.get(globcfg)
+
+
+@contextmanager
+def use_globcfg(globcfg_):
+    """Use specified global configuration for all operations inside the context.
+
+    Contexts are local to the thread or asyncio task, so register maps with different configurations
+    can be processed concurrently::
+
+        with config.use_globcfg(globcfg):
+            rmap.validate()
+            generators.Verilog(rmap).generate()
+    """
+    validate_globcfg(globcfg_)
+    token = _context_globcfg.set(globcfg_)
+    try:
+        yield globcfg_
+    finally:
+        _context_globcfg.reset(token)
@@ -19,11 +19,13 @@ class EnumValue():
     :type description: str
     """
 
+    __slots__ = ('_name', '_names', '_description', '_value', '_etc')
+
     def __init__(self, name='enum', value=0, description='Enumerated value', **args):
         self.name = name
         self.description = description
         self.value = value
-        self.etc = args
+        self._etc = args or None
 
     def __eq__(self, other):
         if self.__class__ != other.__class__:
@@ -54,20 +56,46 @@ class EnumValue():
     def as_dict(self):
         """Create a dictionary with the key attributes of the bit field."""
         d = {'name': self.name, 'description': self.description, 'value': self.value}
-        d.update(self.etc)
+        if self._etc:
+            d.update(self._etc)
         return d
 
+    def _name_variants(self):
+        # names are cached for the name case of the current configuration
+        name_case = config.get_globcfg()['force_name_case']
+        names = self._names
+        if names is None or names[0] != name_case:
+            names = self._names = utils.name_variants(self._name, name_case)
+        return names
+
     @property
     def name(self):
         """Name of the enum."""
-        return utils.force_name_case(self._name)
+        return self._name_variants()[1]
 
     @name.setter
     def name(self, value):
         if not utils.is_str(value):
             raise ValueError(
                 "'name' attribute has to be 'str', but '%s' provided for the enum!" % type(value))
+        utils.model_version += 1
         self._name = value
+        self._names = None
+
+    @property
+    def name_lower(self):
+        """Name of the enum in lowercase."""
+        return self._name_variants()[2]
+
+    @property
+    def name_upper(self):
+        """Name of the enum in uppercase."""
+        return self._name_variants()[3]
+
+    @property
+    def name_capitalized(self):
+        """Name of the enum with the first letter capitalized."""
+        return self._name_variants()[4]
 
     @property
     def value(self):
@@ -76,6 +104,7 @@ class EnumValue():
 
     @value.setter
     def value(self, value_):
+        utils.model_version += 1
         self._value = utils.str2int(value_)
 
     @property
@@ -88,8 +117,20 @@ class EnumValue():
         if not utils.is_str(value):
             raise ValueError("'description' attribute has to be 'str', but '%s' provided for the '%s' enum!" %
                              (type(value), self.name))
+        utils.model_version += 1
         self._description = value
 
+    @property
+    def etc(self):
+        """Dictionary with custom attributes of the enum."""
+        if self._etc is None:
+            self._etc = {}
+        return self._etc
+
+    @etc.setter
+    def etc(self, value):
+        self._etc = value
+
     def validate(self):
         """Validate parameters of the enum."""
         # value type
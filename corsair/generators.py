@@ -5,15 +5,79 @@
 """
 
 import os
+import io
 import json
-import yaml
-import jinja2
+import hashlib
 from corsair import __version__
 from . import utils
 from . import config
+from . import cache
 from .regmap import RegisterMap
 from pathlib import Path
-import wavedrom
+
+# Size of the chunks to write streamed data, in characters or bytes
+WRITE_CHUNK_SIZE = 2**16
+
+
+def _join_chunks(chunks):
+    """Join small chunks of text or bytes into bytes chunks of :data:`WRITE_CHUNK_SIZE` or more."""
+    buf = []
+    buf_size = 0
+    for chunk in chunks:
+        buf.append(chunk)
+        buf_size += len(chunk)
+        if buf_size >= WRITE_CHUNK_SIZE:
+            yield ''.join(buf).encode('utf-8') if isinstance(buf[0], str) else b''.join(buf)
+            buf = []
+            buf_size = 0
+    if buf:
+        yield ''.join(buf).encode('utf-8') if isinstance(buf[0], str) else b''.join(buf)
+
+
+def write_file(path, data):
+    """Write text or bytes to the file only if its content differs, so mtime of the file is kept when
+    nothing is changed. File is replaced atomically. Parent directories are created if needed.
+
+    Data can also be an iterable of text or bytes chunks, e.g. Jinja2 template stream. Chunks are written
+    as they come, so the whole content is never kept in memory, and compared with the file at the end.
+
+    :param path: Path to the file
+    :param data: Text or bytes to write, or iterable of text or bytes chunks
+    :return: True if the file was changed
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    path = Path(path)
+    try:
+        stat = path.stat()
+        if isinstance(data, bytes) and stat.st_size == len(data) and \
+           cache.hash_file(path) == hashlib.sha256(data).hexdigest():
+            return False
+        mode = stat.st_mode & 0o7777
+    except OSError:
+        stat = None
+        # permissions of the new file are set by umask
+        mode = None
+    utils.create_dirs(path)
+    if isinstance(data, bytes):
+        cache.write_atomic(path, data, mode)
+        return True
+
+    # calculate size and hash of the new content on the fly, then compare with the file
+    digest = hashlib.sha256()
+    size = 0
+
+    def chunks():
+        nonlocal size
+        for chunk in _join_chunks(data):
+            digest.update(chunk)
+            size += len(chunk)
+            yield chunk
+
+    def changed():
+        return stat is None or stat.st_size != size or cache.hash_file(path) != digest.hexdigest()
+
+    return cache.write_atomic(path, chunks(), mode, changed)
 
 
 class Generator():
@@ -26,6 +90,7 @@ class Generator():
     def __init__(self, rmap, **args):
         self.rmap = rmap
         self.etc = args
+        self.outputs = {}
 
     def _name(self):
         return self.__class__.__name__
@@ -34,10 +99,22 @@ class Generator():
         """Do file generation."""
         pass
 
+    def write_output(self, path, data):
+        """Write text or bytes to the output file if its content differs.
+        Status of the file is saved to `outputs` dictionary: path -> True if the file was changed.
+
+        :param path: Path to the output file
+        :param data: Text or bytes to write, or iterable of text or bytes chunks
+        :return: True if the file was changed
+        """
+        changed = write_file(path, data)
+        self.outputs[str(path)] = changed
+        return changed
+
     def validate(self):
         """Validate generator parameters."""
         # config
-        config.validate_globcfg(config.globcfg)
+        config.validate_globcfg(config.get_globcfg())
         # rmap
         assert isinstance(self.rmap, RegisterMap), \
             "Register map has to be '%s', but '%s' was provided for '%s' generator!" % (
@@ -53,13 +130,43 @@ class Generator():
         params = vars(self)
         params.pop('etc')
         params.pop('rmap')
+        params.pop('outputs')
         params['generator'] = self._name()
         return {name: params}
 
 
+# Jinja2 environments shared by all generators: (templates path, bytecode cache path) -> environment
+_j2_envs = {}
+
+
 class Jinja2():
     """Basic class for rendering Jinja2 templates"""
 
+    def j2_env(self, templates_path=None):
+        """Get Jinja2 environment for the templates path.
+
+        Environment is created once per path, so every template is compiled only once per process.
+        If persistent cache is enabled, compiled templates are also saved there to be reused by other processes.
+
+        :param templates_path: Path to search templates. If no path provided, then internal templates will be used
+        :return: Jinja2 environment
+        """
+        if not templates_path:
+            templates_path = str(Path(__file__).parent / 'templates')
+        templates_path = os.path.abspath(str(templates_path))
+        bytecode_cache_dir = cache.get_cache_dir('jinja2')
+        env_key = (templates_path, bytecode_cache_dir)
+        if env_key not in _j2_envs:
+            import jinja2
+            bytecode_cache = None
+            if bytecode_cache_dir:
+                bytecode_cache = jinja2.FileSystemBytecodeCache(str(bytecode_cache_dir))
+            j2_env = jinja2.Environment(loader=jinja2.FileSystemLoader(searchpath=templates_path),
+                                        trim_blocks=True, lstrip_blocks=True, bytecode_cache=bytecode_cache)
+            j2_env.globals.update(zip=zip)
+            _j2_envs[env_key] = j2_env
+        return _j2_envs[env_key]
+
     def render(self, template, vars, templates_path=None):
         """Render text with Jinja2.
 
@@ -69,38 +176,69 @@ class Jinja2():
         :return: String with rendered text
         """
         # prepare template
-        if not templates_path:
-            templates_path = str(Path(__file__).parent / 'templates')
-        j2_env = jinja2.Environment(loader=jinja2.FileSystemLoader(searchpath=templates_path),
-                                    trim_blocks=True, lstrip_blocks=True)
-        j2_env.globals.update(zip=zip)
-        j2_template = j2_env.get_template(template)
+        j2_template = self.j2_env(templates_path).get_template(template)
         # render
         return j2_template.render(vars)
 
     def render_to_file(self, template, vars, path, templates_path=None):
-        """Render text with Jinja2 and save it to the file.
+        """Render text with Jinja2 and save it to the file. Text is written chunk by chunk as it is rendered.
 
         :param template: Jinja2 template filename
         :param vars: Dictionary with variables for Jinja2 rendering
         :param path: Path to the output file
         :param templates_path: Path to search templates. If no path provided, then internal templates will be used
+        :return: True if the file was changed
         """
-        # render
-        rendered_text = self.render(template, vars, templates_path)
-        # save
-        utils.create_dirs(self.path)
-        with open(path, "w") as f:
-            f.write(rendered_text)
+        # prepare template
+        j2_template = self.j2_env(templates_path).get_template(template)
+        # render and save chunk by chunk
+        return self.write_output(path, j2_template.generate(vars))
+
+
+# Images rendered or loaded by the current process: wavedrom description hash -> SVG image.
+# Least recently used images are dropped when there are more than WAVEDROM_MEMO_SIZE of them.
+_wavedrom_svgs = {}
+WAVEDROM_MEMO_SIZE = 1024
+
+
+def _wavedrom_memo(key, svg):
+    """Save image to the memory of the process. Return the image."""
+    _wavedrom_svgs.pop(key, None)
+    _wavedrom_svgs[key] = svg
+    while len(_wavedrom_svgs) > WAVEDROM_MEMO_SIZE:
+        del _wavedrom_svgs[next(iter(_wavedrom_svgs))]
+    return svg
+
+
+def _wavedrom_key(reg_wd):
+    """Create cache key for the wavedrom description of the register."""
+    return cache.hash_data([cache.CACHE_FORMAT, __version__, reg_wd])
+
+
+def _wavedrom_render(reg_wd):
+    """Render wavedrom description of the register to SVG image."""
+    import wavedrom
+    svg = io.StringIO()
+    wavedrom.render(reg_wd).write(svg)
+    return svg.getvalue()
 
 
 class Wavedrom():
     """Basic class for rendering register images with wavedrom"""
 
+    # Number of worker processes to render images. None - use number of CPUs, 1 - render in the current process.
+    # Worker processes can be started only by scripts with `if __name__ == '__main__'` guard, so they are disabled
+    # by default and enabled by the command line interface.
+    draw_jobs = 1
+    # Minimum number of unique images to start worker processes, as the start itself takes time
+    draw_jobs_threshold = 32
+
     def draw_regs(self, imgdir, rmap):
         imgdir.mkdir(exist_ok=True)
 
-        bits = config.globcfg['data_width']
+        # registers with the same layout share the same image
+        images = {}  # wavedrom description -> image paths
+        bits = config.get_globcfg()['data_width']
         lanes = bits // 16 if bits > 16 else 1
         for reg in rmap:
             reg_wd = {"reg": [],
@@ -119,7 +257,40 @@ class Wavedrom():
                 bit_pos = bf.msb
             if (bits - 1) > bit_pos:
                 reg_wd["reg"].append({"bits": bits - bit_pos - 1})
-            wavedrom.render(json.dumps(reg_wd)).saveas(str(imgdir / ("%s.svg" % reg.name.lower())))
+            images.setdefault(json.dumps(reg_wd), []).append(imgdir / ("%s.svg" % reg.name_lower))
+
+        # look for already rendered images
+        svgs = {}
+        for reg_wd in images.keys():
+            key = _wavedrom_key(reg_wd)
+            svg = _wavedrom_svgs.get(key)
+            if svg is None:
+                svg = cache.load('svg', key)
+            else:
+                cache.count('svg', True)
+            if svg is not None:
+                svgs[reg_wd] = _wavedrom_memo(key, svg)
+
+        # render
+        reg_wds = [reg_wd for reg_wd in images.keys() if reg_wd not in svgs]
+        jobs = self.draw_jobs or os.cpu_count() or 1
+        if jobs > 1 and len(reg_wds) >= self.draw_jobs_threshold:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                rendered = list(pool.map(_wavedrom_render, reg_wds, chunksize=max(1, len(reg_wds) // (jobs * 4))))
+        else:
+            rendered = [_wavedrom_render(reg_wd) for reg_wd in reg_wds]
+        for reg_wd, svg in zip(reg_wds, rendered):
+            key = _wavedrom_key(reg_wd)
+            svgs[reg_wd] = _wavedrom_memo(key, svg)
+            cache.store('svg', key, svg, check_size=False)
+        if reg_wds:
+            cache.evict()
+
+        # save
+        for reg_wd, svg in svgs.items():
+            for path in images[reg_wd]:
+                self.write_output(path, svg)
 
 
 class Json(Generator):
@@ -141,9 +312,7 @@ class Json(Generator):
         # prepare data
         data = {'regmap': list(self.rmap.as_dict().values())}
         # dump
-        utils.create_dirs(self.path)
-        with open(self.path, 'w') as f:
-            json.dump(data, f, indent=4)
+        self.write_output(self.path, json.dumps(data, indent=4))
 
 
 class Yaml(Generator):
@@ -165,10 +334,9 @@ class Yaml(Generator):
         # prepare data
         data = {'regmap': list(self.rmap.as_dict().values())}
         # dump
-        utils.create_dirs(self.path)
-        with open(self.path, 'w') as f:
-            yaml.Dumper.ignore_aliases = lambda *args: True  # hack to disable aliases
-            yaml.dump(data, f, indent=4, default_flow_style=False, sort_keys=False)
+        import yaml
+        yaml.Dumper.ignore_aliases = lambda *args: True  # hack to disable aliases
+        self.write_output(self.path, yaml.dump(data, indent=4, default_flow_style=False, sort_keys=False))
 
 
 class Txt(Generator):
@@ -193,8 +361,8 @@ class Txt(Generator):
             if len(reg) > 1:
                 raise ValueError("Only registers with single bitfield are allowed for %s generator." % self._name())
         # prepare template strings
-        data_w = config.globcfg['data_width']
-        address_w = config.globcfg['address_width']
+        data_w = config.get_globcfg()['data_width']
+        address_w = config.get_globcfg()['address_width']
         address_digits = address_w // 4 + (1 if address_w % 4 else 0)
         address_str = "0x%0{0}x".format(address_digits)
         reset_digits = data_w // 4 + (1 if data_w % 4 else 0)
@@ -225,9 +393,7 @@ class Txt(Generator):
             out_lines.append(row_template % (col_address[i], col_names[i],
                              col_width[i], col_access[i], col_hardware[i], col_reset[i], col_description[i]))
         # save to file
-        utils.create_dirs(self.path)
-        with open(self.path, 'w') as f:
-            f.writelines(out_lines)
+        self.write_output(self.path, ''.join(out_lines))
 
 
 class Verilog(Generator, Jinja2):
@@ -265,7 +431,7 @@ class Verilog(Generator, Jinja2):
         j2_vars['module_name'] = utils.get_file_name(self.path)
         j2_vars['read_filler'] = utils.str2int(self.read_filler)
         j2_vars['interface'] = self.interface
-        j2_vars['config'] = config.globcfg
+        j2_vars['config'] = config.get_globcfg()
         # render
         self.render_to_file(j2_template, j2_vars, self.path)
 
@@ -305,7 +471,7 @@ class Vhdl(Generator, Jinja2):
         j2_vars['module_name'] = utils.get_file_name(self.path)
         j2_vars['read_filler'] = utils.str2int(self.read_filler)
         j2_vars['interface'] = self.interface
-        j2_vars['config'] = config.globcfg
+        j2_vars['config'] = config.get_globcfg()
         # render
         self.render_to_file(j2_template, j2_vars, self.path)
 
@@ -336,7 +502,7 @@ class VerilogHeader(Generator, Jinja2):
         j2_vars['rmap'] = self.rmap
         j2_vars['prefix'] = self.prefix.upper()
         j2_vars['file_name'] = utils.get_file_name(self.path)
-        j2_vars['config'] = config.globcfg
+        j2_vars['config'] = config.get_globcfg()
         # render
         self.render_to_file(j2_template, j2_vars, self.path)
 
@@ -360,9 +526,9 @@ class CHeader(Generator, Jinja2):
     def validate(self):
         super().validate()
         data_width_allowed = [8, 16, 32, 64]
-        assert config.globcfg['data_width'] in [8, 16, 32, 64], \
+        assert config.get_globcfg()['data_width'] in [8, 16, 32, 64], \
             "For %s generator, global 'data_width' must be one of '%s', but current is %d" % \
-            (self._name(), data_width_allowed, config.globcfg['data_width'])
+            (self._name(), data_width_allowed, config.get_globcfg()['data_width'])
 
     def generate(self):
         # validate parameters
@@ -374,7 +540,7 @@ class CHeader(Generator, Jinja2):
         j2_vars['rmap'] = self.rmap
         j2_vars['prefix'] = self.prefix.upper()
         j2_vars['file_name'] = utils.get_file_name(self.path)
-        j2_vars['config'] = config.globcfg
+        j2_vars['config'] = config.get_globcfg()
         # render
         self.render_to_file(j2_template, j2_vars, self.path)
 
@@ -405,7 +571,7 @@ class SystemVerilogPackage(Generator, Jinja2):
         j2_vars['rmap'] = self.rmap
         j2_vars['prefix'] = self.prefix.upper()
         j2_vars['file_name'] = utils.get_file_name(self.path)
-        j2_vars['config'] = config.globcfg
+        j2_vars['config'] = config.get_globcfg()
         # render
         self.render_to_file(j2_template, j2_vars, self.path)
 
@@ -443,7 +609,7 @@ class LbBridgeVerilog(Generator, Jinja2):
         j2_vars = {}
         j2_vars['corsair_ver'] = __version__
         j2_vars['module_name'] = utils.get_file_name(self.path)
-        j2_vars['config'] = config.globcfg
+        j2_vars['config'] = config.get_globcfg()
         # render
         self.render_to_file(j2_template, j2_vars, self.path)
 
@@ -481,7 +647,7 @@ class LbBridgeVhdl(Generator, Jinja2):
         j2_vars = {}
         j2_vars['corsair_ver'] = __version__
         j2_vars['module_name'] = utils.get_file_name(self.path)
-        j2_vars['config'] = config.globcfg
+        j2_vars['config'] = config.get_globcfg()
         # render
         self.render_to_file(j2_template, j2_vars, self.path)
 
@@ -526,7 +692,7 @@ class Markdown(Generator, Jinja2, Wavedrom):
         j2_vars['image_dir'] = self.image_dir
         j2_vars['filename'] = filename
         j2_vars['title'] = self.title
-        j2_vars['config'] = config.globcfg
+        j2_vars['config'] = config.get_globcfg()
         # render
         self.render_to_file(j2_template, j2_vars, self.path)
         # draw register images
@@ -574,7 +740,7 @@ class Asciidoc(Generator, Jinja2, Wavedrom):
         j2_vars['image_dir'] = self.image_dir
         j2_vars['filename'] = filename
         j2_vars['title'] = self.title
-        j2_vars['config'] = config.globcfg
+        j2_vars['config'] = config.get_globcfg()
         # render
         self.render_to_file(j2_template, j2_vars, self.path)
         # draw register images
@@ -603,6 +769,6 @@ class Python(Generator, Jinja2):
         j2_vars = {}
         j2_vars['corsair_ver'] = __version__
         j2_vars['rmap'] = self.rmap
-        j2_vars['config'] = config.globcfg
+        j2_vars['config'] = config.get_globcfg()
         # render
         self.render_to_file(j2_template, j2_vars, self.path)
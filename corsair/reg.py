@@ -19,13 +19,16 @@ class Register():
     :type address: int, None
     """
 
+    __slots__ = ('_bitfields', '_name', '_names', '_description', '_address', '_etc', '_maps')
+
     def __init__(self, name='csr0', description='Control and status register 0', address=None, **args):
         self._bitfields = []
+        self._maps = ()  # register maps containing the register, their lookup indexes depend on its name and address
 
         self.name = name
         self.description = description
         self.address = address
-        self.etc = args
+        self._etc = args or None
 
     def __eq__(self, other):
         if self.__class__ != other.__class__:
@@ -39,9 +42,23 @@ class Register():
         else:
             return not self.__eq__(other)
 
+    def __getstate__(self):
+        # maps are not saved, every map adds itself back when it is loaded
+        return None, {s: getattr(self, s) for s in self.__slots__ if s != '_maps' and hasattr(self, s)}
+
+    def __setstate__(self, state):
+        for slot, value in state[1].items():
+            setattr(self, slot, value)
+        self._maps = ()
+
     def __repr__(self):
         return 'Register(%s, %s, %s)' % (repr(self.name), repr(self.description), repr(self.address))
 
+    def _index_outdated(self):
+        """Notify the maps containing the register that their lookup indexes are outdated."""
+        for rmap in self._maps:
+            rmap._index_state = None
+
     def __str__(self):
         return self.as_str()
 
@@ -62,7 +79,8 @@ class Register():
             'address': self.address,
             'bitfields': [bf.as_dict() for bf in self.bitfields]
         }
-        d.update(self.etc)
+        if self._etc:
+            d.update(self._etc)
         return d
 
     def __len__(self):
@@ -89,16 +107,43 @@ class Register():
         raise KeyError("Not able to set '%s' bit field directly in the '%s' register!"
                        " Try to use add_bitfields() method." % (key, self.name))
 
+    def _name_variants(self):
+        # names are cached for the name case of the current configuration
+        name_case = config.get_globcfg()['force_name_case']
+        names = self._names
+        if names is None or names[0] != name_case:
+            names = self._names = utils.name_variants(self._name, name_case)
+        return names
+
     @property
     def name(self):
         """Name of the register."""
-        return utils.force_name_case(self._name)
+        return self._name_variants()[1]
 
     @name.setter
     def name(self, value):
         if not utils.is_str(value):
             raise ValueError("'name' attribute has to be 'str', but '%s' provided for the register!" % type(value))
+        if hasattr(self, '_name') and self._name != value:
+            self._index_outdated()
+        utils.model_version += 1
         self._name = value
+        self._names = None
+
+    @property
+    def name_lower(self):
+        """Name of the register in lowercase."""
+        return self._name_variants()[2]
+
+    @property
+    def name_upper(self):
+        """Name of the register in uppercase."""
+        return self._name_variants()[3]
+
+    @property
+    def name_capitalized(self):
+        """Name of the register with the first letter capitalized."""
+        return self._name_variants()[4]
 
     @property
     def address(self):
@@ -107,7 +152,12 @@ class Register():
 
     @address.setter
     def address(self, value):
-        self._address = utils.str2int(value)
+        value = utils.str2int(value)
+        # register without address can't be indexed by a map, so there is nothing to track
+        if getattr(self, '_address', None) is not None and self._address != value:
+            self._index_outdated()
+        utils.model_version += 1
+        self._address = value
 
     @property
     def description(self):
@@ -119,8 +169,21 @@ class Register():
         if not utils.is_str(value):
             raise ValueError("'description' attribute has to be 'str', but '%s' provided for '%s' register!" %
                              (type(value), self.name))
+        utils.model_version += 1
         self._description = value
 
+    @property
+    def etc(self):
+        """Dictionary with custom attributes of the register."""
+        # most of the objects have no custom attributes, so dictionary is created on demand
+        if self._etc is None:
+            self._etc = {}
+        return self._etc
+
+    @etc.setter
+    def etc(self, value):
+        self._etc = value
+
     @property
     def bitfield_names(self):
         """List with all bit field names."""
@@ -139,18 +202,25 @@ class Register():
         # hack to handle single elements
         new_bitfields = utils.listify(new_bitfields)
 
+        # bits occupied by the bit fields, which could be changed after they had been added
+        bits_mask = 0
+        for bf in self._bitfields:
+            bits_mask |= bf.mask
+
         # add bit fields to list one by one
         for bf in new_bitfields:
             # check existance
             assert bf.name not in self.bitfield_names, \
                 "Bit field with name '%s' is already present in '%s' register!" % (bf.name, self.name)
             # check fields overlapping
-            overlaps = [set(bf.bits).intersection(set(old_bf.bits)) for old_bf in self._bitfields]
-            overlaps_names = [self.bitfield_names[i] for i, ovl in enumerate(overlaps) if ovl]
-            assert not (self.bitfields and overlaps_names), \
-                "Position of a bit field '%s' conflicts with other bit field(s): %s!" % (bf.name, repr(overlaps_names))
+            bf_mask = bf.mask
+            if bf_mask & bits_mask:
+                overlaps_names = [old_bf.name for old_bf in self._bitfields if bf_mask & old_bf.mask]
+                assert not overlaps_names, \
+                    "Position of a bit field '%s' conflicts with other bit field(s): %s!" % \
+                    (bf.name, repr(overlaps_names))
             # check bit field conflicts with data width
-            data_width = config.globcfg['data_width']
+            data_width = config.get_globcfg()['data_width']
             assert bf.msb < data_width, \
                 "Field '%s' (msb=%d) exceeds interface data width %d!" % \
                 (bf.name, bf.msb, data_width)
@@ -162,6 +232,8 @@ class Register():
             except StopIteration:
                 # when bit field list is empty or all bit field msb positions are less than the current one
                 self._bitfields.append(bf)
+            bits_mask |= bf_mask
+            utils.model_version += 1
         return self
 
     @property
@@ -193,23 +265,30 @@ class Register():
             "Address value '%s' for '%s' is wrong! Only non-negative integers are allowed." % (self.address, self.name)
 
         # bit fields overlapping
+        # bit fields could be changed after they had been added, so occupied bits are calculated from scratch
+        occupied_mask = 0
+        overlapped_mask = 0
         for bf in self._bitfields:
-            overlaps = [set(bf.bits).intersection(set(bf_.bits)) for bf_ in self._bitfields]
-            overlaps_names = [self.bitfield_names[i] for i, ovl in enumerate(overlaps) if ovl]
-            overlaps_names.pop(overlaps_names.index(bf.name))
-            assert not overlaps_names, \
-                "Position and size of a bit field '%s' conflicts with other bit field(s): %s!" % \
-                (bf.name, repr(overlaps_names))
+            bf_mask = bf.mask
+            overlapped_mask |= occupied_mask & bf_mask
+            occupied_mask |= bf_mask
+        if overlapped_mask:
+            for bf in self._bitfields:
+                overlaps_names = [bf_.name for bf_ in self._bitfields if bf_ is not bf and bf_.mask & bf.mask]
+                assert not overlaps_names, \
+                    "Position and size of a bit field '%s' conflicts with other bit field(s): %s!" % \
+                    (bf.name, repr(overlaps_names))
 
         # bit fields vs data_width
-        data_width = config.globcfg['data_width']
+        data_width = config.get_globcfg()['data_width']
         for bf in self._bitfields:
             assert bf.msb < data_width, \
                 "Field '%s' (msb=%d) exceeds interface data width %d!" % \
                 (bf.name, bf.msb, data_width)
 
         # bit fields
+        names_duplicates = utils.get_duplicates(self.bitfield_names)
         for bf in self.bitfields:
-            assert self.bitfield_names.count(bf.name) == 1, \
+            assert bf.name not in names_duplicates, \
                 "Bitfield '%s' name is not unique!" % (bf.name)
             bf.validate()
@@ -6,11 +6,181 @@
 
 from . import utils
 from . import config
+from . import cache
 from .reg import Register
 from .bitfield import BitField
 from .enum import EnumValue
+import bisect
 import json
-import yaml
+
+# YAML loader class. It is chosen on the first use, as importing of yaml takes time.
+YamlLoader = None
+
+
+def _yaml_loader():
+    """Get YAML loader class. libyaml based loader is much faster than the pure Python one."""
+    global YamlLoader
+    if YamlLoader is None:
+        try:
+            from yaml import CSafeLoader as YamlLoader
+        except ImportError:
+            from yaml import SafeLoader as YamlLoader
+    return YamlLoader
+
+
+def _yaml_compose_node(loader, anchors):
+    """Compose YAML node from the parser events. Works for both pure Python and libyaml based loaders."""
+    import yaml
+    event = loader.get_event()
+    if isinstance(event, yaml.AliasEvent):
+        return anchors[event.anchor]
+    if isinstance(event, yaml.ScalarEvent):
+        tag = event.tag
+        if tag is None or tag == '!':
+            tag = loader.resolve(yaml.ScalarNode, event.value, event.implicit)
+        node = yaml.ScalarNode(tag, event.value, event.start_mark, event.end_mark, style=event.style)
+        if event.anchor is not None:
+            anchors[event.anchor] = node
+    elif isinstance(event, yaml.SequenceStartEvent):
+        tag = event.tag
+        if tag is None or tag == '!':
+            tag = loader.resolve(yaml.SequenceNode, None, event.implicit)
+        node = yaml.SequenceNode(tag, [], event.start_mark, None, flow_style=event.flow_style)
+        if event.anchor is not None:
+            anchors[event.anchor] = node
+        while not loader.check_event(yaml.SequenceEndEvent):
+            node.value.append(_yaml_compose_node(loader, anchors))
+        node.end_mark = loader.get_event().end_mark
+    elif isinstance(event, yaml.MappingStartEvent):
+        tag = event.tag
+        if tag is None or tag == '!':
+            tag = loader.resolve(yaml.MappingNode, None, event.implicit)
+        node = yaml.MappingNode(tag, [], event.start_mark, None, flow_style=event.flow_style)
+        if event.anchor is not None:
+            anchors[event.anchor] = node
+        while not loader.check_event(yaml.MappingEndEvent):
+            key_node = _yaml_compose_node(loader, anchors)
+            value_node = _yaml_compose_node(loader, anchors)
+            node.value.append((key_node, value_node))
+        node.end_mark = loader.get_event().end_mark
+    else:
+        raise ValueError("Unexpected YAML event '%s'!" % event)
+    return node
+
+
+def _yaml_iter_regmap(f):
+    """Parse YAML file and yield items of the top level 'regmap' sequence one by one."""
+    import yaml
+    loader = _yaml_loader()(f)
+    anchors = {}
+    try:
+        loader.get_event()  # stream start
+        loader.get_event()  # document start
+        if not loader.check_event(yaml.MappingStartEvent):
+            raise ValueError("Top level of the register map file has to be a mapping!")
+        loader.get_event()
+        regmap_found = False
+        while not loader.check_event(yaml.MappingEndEvent):
+            key = loader.construct_document(_yaml_compose_node(loader, anchors))
+            if key == 'regmap' and loader.check_event(yaml.SequenceStartEvent):
+                regmap_found = True
+                loader.get_event()
+                while not loader.check_event(yaml.SequenceEndEvent):
+                    yield loader.construct_document(_yaml_compose_node(loader, anchors))
+                loader.get_event()
+            else:
+                _yaml_compose_node(loader, anchors)
+        if not regmap_found:
+            raise KeyError('regmap')
+    finally:
+        loader.dispose()
+
+
+class _JsonStream():
+    """Incremental reader of JSON values from a text file. Only a small chunk of the file is kept in memory."""
+
+    def __init__(self, f, chunk_size=2**16):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    def _read(self):
+        """Read next chunk of the file. Size of the chunk grows with the size of unparsed data."""
+        chunk = self._f.read(max(self._chunk_size, len(self._buf) - self._pos))
+        self._eof = not chunk
+        self._buf += chunk
+        return not self._eof
+
+    def error(self, msg):
+        raise json.JSONDecodeError(msg, self._buf, self._pos)
+
+    def peek(self):
+        """Skip whitespaces and return next character without consuming it. Empty string means end of file."""
+        if self._pos > self._chunk_size:
+            # drop already parsed data
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in ' \t\n\r':
+                self._pos += 1
+            if self._pos < len(self._buf) or not self._read():
+                return self._buf[self._pos:self._pos + 1]
+
+    def expect(self, chars):
+        """Consume next character, which has to be one of the specified."""
+        ch = self.peek()
+        if not ch or ch not in chars:
+            self.error("Expecting one of '%s'" % chars)
+        self._pos += 1
+        return ch
+
+    def decode(self):
+        """Decode next JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # value at the end of the buffer (e.g. number) might be incomplete
+                if end < len(self._buf) or self._eof or not self._read():
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof or not self._read():
+                    raise
+
+
+def _json_iter_regmap(f, chunk_size=2**16):
+    """Parse JSON file and yield items of the top level 'regmap' array one by one."""
+    stream = _JsonStream(f, chunk_size)
+    regmap_found = False
+    stream.expect('{')
+    if stream.peek() == '}':
+        stream.expect('}')
+    else:
+        while True:
+            key = stream.decode()
+            stream.expect(':')
+            if key == 'regmap' and stream.peek() == '[':
+                regmap_found = True
+                stream.expect('[')
+                if stream.peek() == ']':
+                    stream.expect(']')
+                else:
+                    while True:
+                        yield stream.decode()
+                        if stream.expect(',]') == ']':
+                            break
+            else:
+                stream.decode()
+            if stream.expect(',}') == '}':
+                break
+    if stream.peek():
+        stream.error("Extra data")
+    if not regmap_found:
+        raise KeyError('regmap')
 
 
 class RegisterMap():
@@ -18,6 +188,29 @@ class RegisterMap():
 
     def __init__(self):
         self._regs = []
+        self._index_clear()
+        self._validated = None  # state of the models and the configuration at the last successful validation
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # lookup indexes are tracked with counters local to the process, so they are rebuilt after loading
+        for key in ['_addrs', '_addrs_sorted', '_reg_by_name', '_reg_by_addr', '_index_state']:
+            del state[key]
+        # model version counter is local to the process, so only the configuration of the validation is saved
+        if self._validated is not None and self._validated == self._validation_state():
+            state['_validated'] = self._validated[1]
+        else:
+            state['_validated'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for reg in self._regs:
+            reg._maps += (self,)
+        self._index_clear()
+        # copy is not changed since it was made, so it is valid for the current model version of this process
+        if self._validated is not None:
+            self._validated = (utils.model_version, self._validated)
 
     def __eq__(self, other):
         if self.__class__ != other.__class__:
@@ -60,7 +253,8 @@ class RegisterMap():
         """Get register by name or index"""
         try:
             if isinstance(key, str):
-                return next(reg for reg in self if reg.name == key)
+                self._index_update()
+                return self._reg_by_name[key]
             else:
                 return self._regs[key]
         except (StopIteration, TypeError, KeyError, IndexError):
@@ -71,46 +265,100 @@ class RegisterMap():
         raise KeyError("Not able to set '%s' register directly!"
                        " Try use add_registers() method." % (key))
 
+    def _index_clear(self):
+        """Drop all lookup indexes of the register map."""
+        self._addrs = []  # addresses of the registers in the same order as they are stored
+        self._addrs_sorted = True
+        self._reg_by_name = {}
+        self._reg_by_addr = {}
+        self._index_state = None
+
+    def _index_update(self):
+        """Rebuild lookup indexes if some registers were renamed or moved after they had been added
+        (registers reset the state of the indexes then), or the name case setting was changed."""
+        state = config.get_globcfg()['force_name_case']
+        if state == self._index_state:
+            return
+        self._addrs = [reg.address for reg in self._regs]
+        self._addrs_sorted = all(a < b for a, b in zip(self._addrs, self._addrs[1:]))
+        self._reg_by_name = {}
+        self._reg_by_addr = {}
+        for reg in self._regs:
+            # the first register wins in case of duplicates, as a linear search would do
+            self._reg_by_name.setdefault(reg.name, reg)
+            self._reg_by_addr.setdefault(reg.address, reg)
+        self._index_state = state
+
+    def _replace_registers(self, regs):
+        """Replace all the registers of the map and drop lookup indexes."""
+        for reg in self._regs:
+            reg._maps = tuple(rmap for rmap in reg._maps if rmap is not self)
+        self._regs = regs
+        for reg in regs:
+            reg._maps += (self,)
+        self._index_clear()
+
+    def _index_insert(self, reg):
+        """Insert register to the list and indexes without breaking ascending order of addresses."""
+        if self._addrs_sorted:
+            reg_idx = bisect.bisect_right(self._addrs, reg.address)
+        else:
+            # some addresses were changed in place, so only linear search can keep the old behaviour
+            reg_idx = next((i for i, r in enumerate(self._regs) if r.address > reg.address), len(self._regs))
+        self._regs.insert(reg_idx, reg)
+        reg._maps += (self,)
+        self._addrs.insert(reg_idx, reg.address)
+        self._reg_by_name.setdefault(reg.name, reg)
+        self._reg_by_addr.setdefault(reg.address, reg)
+
     @property
     def reg_names(self):
         """List with all register names."""
         return [reg.name for reg in self]
 
-    def _addr_resolve(self, reg):
-        """Resolve address for a register with no address."""
+    def _addr_resolve(self, reg, last_reg=None):
+        """Resolve address for a register with no address.
+
+        Address is calculated from the register with the highest address, which is the last register of the map
+        if no other register is specified.
+        """
+        if last_reg is None and self._regs:
+            last_reg = self._regs[-1]
+        globcfg = config.get_globcfg()
         # some error checks
-        assert len(self) != 0, \
+        assert last_reg is not None, \
             "Register '%s' with no address is not allowed to be the first register in a map!" % (reg.name)
-        assert config.globcfg['address_increment'] != 'none', \
+        assert globcfg['address_increment'] != 'none', \
             "Register '%s' with no address is not allowed when address auto increment is disabled!" % (reg.name)
 
-        prev_addr = self.regs[-1].address
+        prev_addr = last_reg.address
 
-        if config.globcfg['address_increment'] == 'data_width':
-            addr_step = config.globcfg['data_width'] // 8
+        if globcfg['address_increment'] == 'data_width':
+            addr_step = globcfg['data_width'] // 8
         else:
-            addr_step = config.globcfg['address_increment']
+            addr_step = globcfg['address_increment']
 
         reg.address = prev_addr + addr_step
 
     def _addr_check_alignment(self, reg):
         """Check address alignment."""
-        if config.globcfg['address_alignment'] == 'none':
+        globcfg = config.get_globcfg()
+        if globcfg['address_alignment'] == 'none':
             align_val = 1
-        elif config.globcfg['address_alignment'] == 'data_width':
-            align_val = config.globcfg['data_width'] // 8
+        elif globcfg['address_alignment'] == 'data_width':
+            align_val = globcfg['data_width'] // 8
         else:
-            align_val = config.globcfg['address_alignment']
+            align_val = globcfg['address_alignment']
 
         assert (reg.address % align_val) == 0, \
             "Register '%s' with address '%d' is not %d bytes alligned!" % (reg.name, reg.address, align_val)
 
     def _addr_check_conflicts(self, reg):
-        addresses = [reg.address for reg in self]
-        if reg.address in addresses:
-            conflict_reg = self[addresses.index(reg.address)]
-            assert False, "Register '%s' with address '%d' conflicts with register '%s' with the same address!" % \
-                (reg.name, reg.address, conflict_reg.name)
+        self._index_update()
+        conflict_reg = self._reg_by_addr.get(reg.address)
+        assert conflict_reg is None, \
+            "Register '%s' with address '%d' conflicts with register '%s' with the same address!" % \
+            (reg.name, reg.address, conflict_reg.name)
 
     @property
     def regs(self):
@@ -128,7 +376,8 @@ class RegisterMap():
         # add registers to the list one by one
         for reg in new_regs:
             # check existance
-            assert reg.name not in self.reg_names, \
+            self._index_update()
+            assert reg.name not in self._reg_by_name, \
                 "Register with name '%s' is already present!" % (reg.name)
             # aplly calculated address if register address is empty
             if reg.address is None:
@@ -138,45 +387,138 @@ class RegisterMap():
             # check address conflicts
             self._addr_check_conflicts(reg)
             # if we here - all is ok and register can be added
-            try:
-                # find position to insert register and not to break ascending order of addresses
-                reg_idx = next(i for i, r in enumerate(self._regs) if r.address > reg.address)
-                self._regs.insert(reg_idx, reg)
-            except StopIteration:
-                # when registers list is empty or all addresses are less than the current one
-                self._regs.append(reg)
+            self._index_update()
+            self._index_insert(reg)
+            utils.model_version += 1
         return self
 
+    def add_registers_bulk(self, new_regs):
+        """Add many registers at once.
+
+        Does the same checks as :meth:`add_registers`, but in a single pass over the new registers,
+        and sorts the register list only once. Map is not changed if any of the registers fails the checks.
+        """
+        # hack to handle single elements
+        new_regs = utils.listify(new_regs)
+        self._index_update()
+        if not self._addrs_sorted:
+            # order of the registers with addresses changed in place can't be reproduced by sorting
+            return self.add_registers(new_regs)
+
+        reg_by_name = dict(self._reg_by_name)
+        reg_by_addr = dict(self._reg_by_addr)
+        last_reg = self._regs[-1] if self._regs else None
+        for reg in new_regs:
+            # check existance
+            assert reg.name not in reg_by_name, \
+                "Register with name '%s' is already present!" % (reg.name)
+            # aplly calculated address if register address is empty
+            if reg.address is None:
+                self._addr_resolve(reg, last_reg)
+            # check address alignment
+            self._addr_check_alignment(reg)
+            # check address conflicts
+            conflict_reg = reg_by_addr.get(reg.address)
+            assert conflict_reg is None, \
+                "Register '%s' with address '%d' conflicts with register '%s' with the same address!" % \
+                (reg.name, reg.address, conflict_reg.name)
+            reg_by_name[reg.name] = reg
+            reg_by_addr[reg.address] = reg
+            if last_reg is None or reg.address > last_reg.address:
+                last_reg = reg
+
+        # all is ok and registers can be added
+        self._regs.extend(new_regs)
+        self._regs.sort(key=lambda reg: reg.address)
+        for reg in new_regs:
+            reg._maps += (self,)
+        self._addrs = [reg.address for reg in self._regs]
+        self._reg_by_name = reg_by_name
+        self._reg_by_addr = reg_by_addr
+        utils.model_version += 1
+        return self
+
+    def _validation_state(self):
+        return (utils.model_version, dict(config.get_globcfg()))
+
     def validate(self):
-        """Validate the register map."""
+        """Validate the register map.
+
+        Validation is skipped if neither registers nor the global configuration were changed since the last one.
+        """
+        state = self._validation_state()
+        if state == self._validated:
+            return
+        names_duplicates = utils.get_duplicates(self.reg_names)
         for reg in self.regs:
-            assert self.reg_names.count(reg.name) == 1, \
+            assert reg.name not in names_duplicates, \
                 "Register '%s' name is not unique!" % (reg.name)
             reg.validate()
+        self._validated = state
 
-    def read_file(self, path):
-        """Read register map from file (based on extension)."""
+    def read_file(self, path, stream=False):
+        """Read register map from file (based on extension).
+
+        Use `stream` to build registers while the file is parsed (YAML and JSON only).
+
+        If persistent cache is enabled (see :func:`corsair.cache.set_cache`), valid register map is saved there
+        and loaded back next time, when neither the file nor the global configuration is changed.
+        """
         ext = utils.get_file_ext(path)
+        if ext not in ['.yaml', '.yml', '.json', '.txt']:
+            raise ValueError("Unknown extension '%s' of the file '%s'" % (ext, path))
+
+        cache_key = cache.regmap_key(path) if cache.cache_dir else None
+        if cache_key:
+            regs = cache.load('regmap', cache_key)
+            if regs is not None:
+                self._replace_registers(regs)
+                # only valid register maps are cached
+                utils.model_version += 1
+                self._validated = self._validation_state()
+                return
+
         if ext in ['.yaml', '.yml']:
-            self.read_yaml(path)
+            self.read_yaml(path, stream)
         elif ext == '.json':
-            self.read_json(path)
-        elif ext == '.txt':
-            self.read_txt(path)
+            self.read_json(path, stream)
         else:
-            raise ValueError("Unknown extension '%s' of the file '%s'" % (ext, path))
+            self.read_txt(path)
+
+        if cache_key:
+            # only valid register maps are cached
+            try:
+                self.validate()
+            except AssertionError:
+                return
+            cache.store('regmap', cache_key, self._regs)
+
+    def read_json(self, path, stream=False):
+        """Read register map from JSON file.
 
-    def read_json(self, path):
-        """Read register map from JSON file."""
+        In stream mode the file is read in chunks and registers are built one by one while the 'regmap' array
+        is parsed, so the whole JSON document is never held in memory together with the register map.
+        """
         with open(path, 'r') as f:
-            data = json.load(f)
-            self._fill_from_file_data(data['regmap'])
+            if stream:
+                self._fill_from_file_data(_json_iter_regmap(f))
+            else:
+                data = json.load(f)
+                self._fill_from_file_data(data['regmap'])
+
+    def read_yaml(self, path, stream=False):
+        """Read register map from YAML file.
 
-    def read_yaml(self, path):
-        """Read register map from YAML file."""
+        In stream mode registers are built one by one while the file is parsed, so the whole YAML document
+        is never held in memory together with the register map.
+        """
         with open(path, 'r') as f:
-            data = yaml.safe_load(f)
-            self._fill_from_file_data(data['regmap'])
+            if stream:
+                self._fill_from_file_data(_yaml_iter_regmap(f))
+            else:
+                import yaml
+                data = yaml.load(f, Loader=_yaml_loader())
+                self._fill_from_file_data(data['regmap'])
 
     def read_txt(self, path):
         """Read register map from text file."""
@@ -213,7 +555,8 @@ class RegisterMap():
 
     def _fill_from_file_data(self, data):
         """Fill register map with data from file."""
-        self._regs = []
+        self._replace_registers([])
+        regs = []
         for data_reg in data:
             data_reg_filtered = {k: v for k, v in data_reg.items() if k != 'bitfields'}
             reg = Register(**data_reg_filtered)
@@ -224,4 +567,5 @@ class RegisterMap():
                     for data_enum in data_bf['enums']:
                         bf.add_enums(EnumValue(**data_enum))
                 reg.add_bitfields(bf)
-            self.add_registers(reg)
+            regs.append(reg)
+        self.add_registers_bulk(regs)
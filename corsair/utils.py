@@ -4,7 +4,6 @@
 """Utility functions and classes
 """
 
-from . import generators
 import os
 from . import config
 from .reg import Register
@@ -89,6 +88,18 @@ def listify(obj):
         return [obj]
 
 
+def get_duplicates(values):
+    """Get set of values which occur more than once. Values have to be hashable."""
+    seen = set()
+    duplicates = set()
+    for val in values:
+        if val in seen:
+            duplicates.add(val)
+        else:
+            seen.add(val)
+    return duplicates
+
+
 def get_file_ext(path):
     _, ext = os.path.splitext(path)
     return ext.lower()
@@ -103,15 +114,29 @@ def create_dirs(path):
     Path(dirs).mkdir(parents=True, exist_ok=True)
 
 
-def force_name_case(name):
-    if config.globcfg["force_name_case"] == "upper":
+def force_name_case(name, name_case=None):
+    if name_case is None:
+        name_case = config.get_globcfg()["force_name_case"]
+    if name_case == "upper":
         return name.upper()
-    elif config.globcfg["force_name_case"] == "lower":
+    elif name_case == "lower":
         return name.lower()
     else:
         return name
 
 
+# Incremented on every change of registers, bit fields and enums,
+# so register maps can skip validation when nothing was changed since the last one
+model_version = 0
+
+
+def name_variants(name, name_case):
+    """Create tuple for caching: name case setting, name with forced case and
+    its lowercase, uppercase and capitalized variants."""
+    name = force_name_case(name, name_case)
+    return (name_case, name, name.lower(), name.upper(), name.capitalize())
+
+
 def create_template_simple():
     """Generate simple register map template"""
     rmap = RegisterMap()
@@ -58,7 +58,7 @@ setuptools.setup(
     project_urls={
         'Documentation': 'https://corsair.readthedocs.io'
     },
-    packages=setuptools.find_packages(exclude='tests'),
+    packages=setuptools.find_packages(exclude=['tests', 'tests.*', 'benchmarks', 'benchmarks.*']),
     package_data={'corsair': ['templates/*.j2']},
     entry_points={
         'console_scripts': [
@@ -75,7 +75,7 @@ setuptools.setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    python_requires='>=3.6',
+    python_requires='>=3.7',
 )
 
 # Clear version info
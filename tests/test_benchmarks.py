@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Benchmarks smoke tests.
+"""
+
+import os
+import sys
+import json
+import subprocess
+from pathlib import Path
+from corsair import config
+
+ROOT = Path(__file__).parent.parent.absolute()
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.synth import synth_regmap  # noqa: E402
+
+
+def test_synth_regmap():
+    """Synthetic register map is valid and the same for the same seed."""
+    config.set_globcfg(config.default_globcfg())
+    rmap = synth_regmap(20, 5, 3)
+    rmap.validate()
+    assert len(rmap) == 20
+    assert all(len(reg) == 5 for reg in rmap)
+    assert rmap == synth_regmap(20, 5, 3)
+    assert rmap != synth_regmap(20, 5, 3, seed=2)
+
+
+def test_bench_phases(tmpdir):
+    """Benchmark writes JSON report with all the selected phases."""
+    output = str(tmpdir.join('bench.json'))
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.pathsep.join([str(ROOT), env.get('PYTHONPATH', '')])
+    subprocess.run([sys.executable, '-m', 'benchmarks.bench_phases', '--regs', '5', '--no-memory',
+                    '--phases', 'read,validate,generate.v_', '-o', output], cwd=str(ROOT), env=env, check=True)
+    with open(output) as f:
+        report = json.load(f)
+    assert report['params']['regs'] == 5
+    assert [p['name'] for p in report['phases']] == [
+        'read.json', 'read.json_stream', 'read.yaml', 'read.yaml_stream', 'read.txt', 'validate',
+        'generate.v_module', 'generate.v_header']
+    assert all(p['time'] > 0 for p in report['phases'])
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Persistent cache module tests.
+"""
+
+import os
+import pytest
+from corsair import cache, config, utils, generators, RegisterMap
+
+
+@pytest.fixture
+def cache_dir(tmpdir):
+    path = str(tmpdir.join('cache'))
+    cache.set_cache(path)
+    yield path
+    cache.set_cache(None)
+
+
+def test_store_load(cache_dir):
+    """Test of saving and loading objects."""
+    assert cache.load('test', 'a') is None
+    cache.store('test', 'a', {'answer': 42})
+    assert cache.load('test', 'a') == {'answer': 42}
+
+
+def test_stats(cache_dir, monkeypatch):
+    """Hits and misses are counted."""
+    monkeypatch.setattr(cache, 'stats', {})
+    cache.load('test', 'a')
+    cache.store('test', 'a', 42)
+    cache.load('test', 'a')
+    cache.load('test', 'a')
+    assert cache.stats == {'test': {'hits': 2, 'misses': 1}}
+
+
+def test_disabled():
+    """Nothing is stored when cache is disabled."""
+    cache.set_cache(None)
+    cache.store('test', 'a', 42)
+    assert cache.load('test', 'a') is None
+
+
+def test_evict(cache_dir):
+    """Least recently used entries are removed when the size limit is exceeded."""
+    cache.store('test', 'a', b'a' * 1000)
+    cache.store('test', 'b', b'b' * 1000)
+    os.utime(os.path.join(cache_dir, 'test', 'a'), (0, 0))
+    cache.set_cache(cache_dir, 1500)
+    cache.store('test', 'c', b'c' * 100)
+    assert cache.load('test', 'a') is None
+    assert cache.load('test', 'b') == b'b' * 1000
+    assert cache.load('test', 'c') == b'c' * 100
+    cache.set_cache(cache_dir, 256 * 2**20)
+
+
+def test_damaged_entry(cache_dir):
+    """Damaged entries are dropped."""
+    cache.store('test', 'a', 42)
+    with open(os.path.join(cache_dir, 'test', 'a'), 'wb') as f:
+        f.write(b'garbage')
+    assert cache.load('test', 'a') is None
+    assert not os.path.exists(os.path.join(cache_dir, 'test', 'a'))
+
+
+def test_regmap(tmpdir, cache_dir, monkeypatch):
+    """Register map is loaded from the cache while file and global configuration are the same."""
+    path = str(tmpdir.join('regs.yaml'))
+    generators.Yaml(utils.create_template(), path).generate()
+    rmap = RegisterMap()
+    rmap.read_file(path)
+
+    def read_yaml(*args):
+        raise AssertionError("File is read again!")
+    monkeypatch.setattr(RegisterMap, 'read_yaml', read_yaml)
+    rmap_cached = RegisterMap()
+    rmap_cached.read_file(path)
+    assert rmap_cached == rmap
+    assert rmap_cached['DATA'].address == rmap['DATA'].address
+
+    # other configuration - other key
+    globcfg = config.default_globcfg()
+    globcfg['address_width'] = 32
+    config.set_globcfg(globcfg)
+    with pytest.raises(AssertionError):
+        RegisterMap().read_file(path)
+    config.set_globcfg(config.default_globcfg())
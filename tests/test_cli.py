@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Command line interface tests.
+"""
+
+import os
+import sys
+import json
+import pstats
+import signal
+import socket
+import threading
+import subprocess
+import pytest
+from pathlib import Path
+
+
+def run_corsair(workdir, *args):
+    """Run corsair in a separate process and return its console output."""
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.pathsep.join([str(Path(__file__).parent.parent.absolute()), env.get('PYTHONPATH', '')])
+    env.pop('CORSAIR_CACHE_DIR', None)
+    res = subprocess.run([sys.executable, '-m', 'corsair', str(workdir)] + list(args), env=env,
+                         stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    assert res.returncode == 0, res.stdout
+    return res.stdout
+
+
+@pytest.fixture
+def project(tmpdir):
+    """Project with YAML register map and configuration file created from templates."""
+    run_corsair(tmpdir, '-t', 'yaml')
+    return tmpdir
+
+
+def test_jobs(project):
+    """Targets are made in parallel, but reported in order."""
+    output_serial = run_corsair(project)
+    with open(str(project.join('hw', 'regs.v'))) as f:
+        verilog = f.read()
+    os.remove(str(project.join('hw', 'regs.v')))
+    output_parallel = run_corsair(project, '-j', '4', '--force')
+    assert output_parallel == output_serial
+    with open(str(project.join('hw', 'regs.v'))) as f:
+        assert f.read() == verilog
+
+
+def test_targets(project):
+    """Only selected targets are made."""
+    output = run_corsair(project, '--targets', 'v_header, c_header')
+    assert "make 'v_header'" in output
+    assert "make 'c_header'" in output
+    assert "make 'v_module'" not in output
+    assert project.join('hw', 'regs.vh').check()
+    assert not project.join('hw', 'regs.v').check()
+
+
+def test_incremental(project):
+    """Only targets with changed dependencies are made again."""
+    output = run_corsair(project)
+    assert "make 'v_module'" in output
+    # nothing is changed
+    output = run_corsair(project)
+    assert "skip 'v_module': up to date" in output
+    assert "read register map" not in output
+    # output is removed
+    os.remove(str(project.join('hw', 'regs.v')))
+    output = run_corsair(project)
+    assert "make 'v_module'" in output
+    assert "skip 'v_header': up to date" in output
+    # target parameters are changed
+    csrconfig = project.join('csrconfig').read()
+    project.join('csrconfig').write(csrconfig.replace('prefix = CSR', 'prefix = REG', 1))
+    output = run_corsair(project)
+    assert "make 'v_header'" in output
+    assert "skip 'v_module': up to date" in output
+    # register map is changed
+    project.join('regs.yaml').write(project.join('regs.yaml').read().replace('Data register', 'Data'))
+    output = run_corsair(project, '--dry-run')
+    assert "would make 'v_module'" in output
+    assert "would make 'v_header'" in output
+    assert "read register map" not in output
+    output = run_corsair(project)
+    assert "make 'v_module'" in output
+    # force
+    output = run_corsair(project, '--force', '--targets', 'v_module')
+    assert "make 'v_module'" in output
+
+
+def test_incremental_outputs(project):
+    """Target is made again when any of its output files is removed, not only the main one."""
+    run_corsair(project, '--targets', 'md_doc')
+    images = project.join('doc', 'md_img')
+    assert images.listdir()
+    output = run_corsair(project, '--targets', 'md_doc')
+    assert "skip 'md_doc': up to date" in output
+    images.remove()
+    output = run_corsair(project, '--targets', 'md_doc')
+    assert "make 'md_doc'" in output
+    assert images.listdir()
+
+
+def test_profile(project):
+    """Profile summary is printed for every phase and target, statistics are saved to the file."""
+    output = run_corsair(project, '--profile-out', str(project.join('prof.out')), '--targets', 'v_module,v_header')
+    summary = output.split('... profile:')[1]
+    for phase in ['read configuration', 'read register map', "make 'v_module'", "make 'v_header'"]:
+        assert phase in summary
+    times = [float(line.split()[0]) for line in summary.splitlines()[2:] if line.startswith('    ')]
+    assert times == sorted(times, reverse=True)
+    pstats.Stats(str(project.join('prof.out')))
+
+
+def test_report(project):
+    """Build report and events describe every target."""
+    report_path = str(project.join('build.json'))
+    run_corsair(project, '--report', report_path, '--targets', 'v_module,md_doc')
+    with open(report_path) as f:
+        report = json.load(f)
+    assert report['validation']['status'] == 'passed'
+    assert report['finish']['status'] == 'success'
+    targets = {t['target']: t for t in report['targets']}
+    assert set(targets.keys()) == {'v_module', 'md_doc'}
+    assert targets['v_module']['generator'] == 'Verilog'
+    assert targets['v_module']['status'] == 'made'
+    assert targets['v_module']['outputs'] == [{'path': 'hw/regs.v', 'bytes': project.join('hw', 'regs.v').size(),
+                                               'changed': True}]
+    assert targets['v_module']['changed']
+    assert len(targets['md_doc']['outputs']) > 1
+
+    # events
+    output = run_corsair(project, '--events', '--force', '-j', '2', '--targets', 'v_module,v_header')
+    events = [json.loads(line) for line in output.splitlines() if line.startswith('{')]
+    assert [e['event'] for e in events] == ['config', 'regmap', 'validation', 'target', 'target', 'finish']
+    assert [(e['target'], e['status'], e['changed']) for e in events if e['event'] == 'target'] == [
+        ('v_module', 'made', False), ('v_header', 'made', True)]
+    assert events[-1]['status'] == 'success'
+
+
+def test_watch(project):
+    """Targets are made again when the register map is changed."""
+    run_corsair(project)
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.pathsep.join([str(Path(__file__).parent.parent.absolute()), env.get('PYTHONPATH', '')])
+    proc = subprocess.Popen([sys.executable, '-m', 'corsair', str(project), '--watch',
+                             '--targets', 'v_module,v_header'],
+                            env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    timer = threading.Timer(60, proc.kill)
+    timer.start()
+    try:
+        def read_until_watch():
+            lines = []
+            for line in proc.stdout:
+                lines.append(line)
+                if 'watch for changes' in line:
+                    break
+            return ''.join(lines)
+        output = read_until_watch()
+        assert "skip 'v_module': up to date" in output
+        # change the register map
+        project.join('regs.yaml').write(project.join('regs.yaml').read().replace('Data register', 'Data'))
+        output = read_until_watch()
+        assert "make 'v_module'" in output
+        assert "make 'v_header'" in output
+        # break the register map and fix it back
+        regs = project.join('regs.yaml').read()
+        project.join('regs.yaml').write(regs.replace('address: 4', 'address: 12'))
+        output = read_until_watch()
+        assert "AssertionError" in output
+        project.join('regs.yaml').write(regs.replace('Data', 'Data register'))
+        output = read_until_watch()
+        assert "make 'v_module'" in output
+        assert "Error" not in output
+    finally:
+        timer.cancel()
+        proc.send_signal(signal.SIGINT)
+        proc.wait(10)
+
+
+@pytest.mark.parametrize('jobs', ['1', '2'])
+def test_batch(tmpdir, jobs):
+    """Many projects are built with one command and the results are summarized."""
+    soc = tmpdir.mkdir('soc')
+    for name in ['a', 'b', 'c']:
+        run_corsair(soc.mkdir(name), '-t', 'yaml')
+    soc.mkdir('docs')
+    report_path = str(tmpdir.join('build.json'))
+    output = run_corsair(soc.join('a'), str(soc.join('*')), str(soc.join('b', 'csrconfig')),
+                         '-j', jobs, '--targets', 'v_module', '--report', report_path)
+    # projects are built once and reported in order
+    assert [line.split("'")[1] for line in output.splitlines() if 'set working directory' in line] == \
+        [str(soc.join(name)) for name in ['a', 'b', 'c']]
+    assert "summary: 3 projects (0 failed), 3 targets made, 0 skipped" in output
+    with open(report_path) as f:
+        report = json.load(f)
+    assert report['summary']['made'] == 3
+    assert [p['status'] for p in report['projects']] == ['success'] * 3
+    assert [t['target'] for p in report['projects'] for t in p['targets']] == ['v_module'] * 3
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="Unix sockets are not supported")
+@pytest.mark.parametrize('jobs', ['1', '2'])
+def test_serve(tmpdir, jobs):
+    """Clients make targets of different projects concurrently through one server."""
+    projects = [tmpdir.mkdir('a'), tmpdir.mkdir('b')]
+    for p in projects:
+        run_corsair(p, '-t', 'yaml')
+    sock = str(tmpdir.join('corsair.sock'))
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.pathsep.join([str(Path(__file__).parent.parent.absolute()), env.get('PYTHONPATH', '')])
+    proc = subprocess.Popen([sys.executable, '-m', 'corsair', '--serve', sock, '-j', jobs],
+                            env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    timer = threading.Timer(60, proc.kill)
+    timer.start()
+    try:
+        assert 'serve on' in proc.stdout.readline()
+        outputs = {}
+
+        def client(p):
+            outputs[str(p)] = run_corsair(p, '--connect', sock, '-j', jobs)
+        clients = [threading.Thread(target=client, args=(p,)) for p in projects]
+        for c in clients:
+            c.start()
+        for c in clients:
+            c.join()
+        for p in projects:
+            assert "set working directory '%s'" % p in outputs[str(p)]
+            assert "make 'v_module'" in outputs[str(p)]
+            # outputs are written to the project of the request, even by reused worker processes
+            for output in ['hw/regs.v', 'sw/regs.h', 'doc/regs.md']:
+                assert p.join(output).check()
+        # the server keeps running
+        assert "skip 'v_module': up to date" in run_corsair(projects[0], '--connect', sock)
+    finally:
+        timer.cancel()
+        proc.send_signal(signal.SIGINT)
+        proc.wait(10)
+    assert not os.path.exists(sock)
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="Unix sockets are not supported")
+def test_serve_socket_path(tmpdir):
+    """Server replaces only stale sockets."""
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.pathsep.join([str(Path(__file__).parent.parent.absolute()), env.get('PYTHONPATH', '')])
+
+    def serve(path):
+        return subprocess.Popen([sys.executable, '-m', 'corsair', '--serve', path], env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    # regular file is kept
+    tmpdir.join('csrconfig').write('[globcfg]')
+    proc = serve(str(tmpdir.join('csrconfig')))
+    assert 'not a socket' in proc.communicate(timeout=30)[0]
+    assert proc.returncode == 1
+    assert tmpdir.join('csrconfig').read() == '[globcfg]'
+    # socket left by a killed server is replaced
+    sock = str(tmpdir.join('corsair.sock'))
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(sock)
+    proc = serve(sock)
+    timer = threading.Timer(60, proc.kill)
+    timer.start()
+    try:
+        assert 'serve on' in proc.stdout.readline()
+        # socket of the running server is not taken over
+        other = serve(sock)
+        assert 'already running' in other.communicate(timeout=30)[0]
+        assert other.returncode == 1
+        assert "set working directory" in run_corsair(tmpdir, '--connect', sock, '-t', 'json')
+    finally:
+        timer.cancel()
+        proc.send_signal(signal.SIGINT)
+        proc.wait(10)
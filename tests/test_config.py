@@ -33,3 +33,57 @@ def test_csrconfig(tmpdir):
     test_globcfg, test_targets = config.read_csrconfig(cfg_path)
     assert test_targets == targets
     assert test_globcfg == globcfg
+
+
+def test_validate_globcfg_types():
+    """Configuration equal to the valid one, but with values of other types, is validated again."""
+    globcfg = config.default_globcfg()
+    config.validate_globcfg(globcfg)
+    with pytest.raises(AssertionError):
+        config.validate_globcfg(dict(globcfg, data_width=32.0))
+
+
+def test_use_globcfg():
+    """Configuration of the context is used inside it and doesn't change the configuration by default."""
+    globcfg = config.default_globcfg()
+    globcfg['data_width'] = 16
+    assert config.get_globcfg() is config.globcfg
+    with config.use_globcfg(globcfg):
+        assert config.get_globcfg() is globcfg
+        assert config.globcfg['data_width'] == 32
+    assert config.get_globcfg() is config.globcfg
+    globcfg['data_width'] = 'many'
+    with pytest.raises(AssertionError):
+        with config.use_globcfg(globcfg):
+            pass
+
+
+def test_use_globcfg_threads(tmpdir):
+    """Register maps with different configurations are generated concurrently in threads."""
+    import threading
+    from corsair import utils, generators
+    rmap = utils.create_template()
+    configs = {}
+    for name_case, data_width in [('lower', 32), ('none', 32), ('lower', 64), ('none', 64)]:
+        globcfg = config.default_globcfg()
+        globcfg.update({'force_name_case': name_case, 'data_width': data_width})
+        configs['%s_%d' % (name_case, data_width)] = globcfg
+
+    def generate(path, globcfg, repeat=1):
+        with config.use_globcfg(globcfg):
+            for _ in range(repeat):
+                rmap.validate()
+                generators.CHeader(rmap, str(path)).generate()
+        return path.read()
+
+    expected = {name: generate(tmpdir.mkdir(name).join('regs.h'), globcfg) for name, globcfg in configs.items()}
+    threads = [threading.Thread(target=generate, args=(tmpdir.join('%s.h' % name), globcfg, 5))
+               for name, globcfg in configs.items()]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for name in configs:
+        assert tmpdir.join('%s.h' % name).read() == expected[name].replace('REGS_H', '%s_H' % name.upper())
+    assert len(set(expected.values())) == len(configs)
+    assert 'uint64_t' in expected['none_64'] and 'uint64_t' not in expected['none_32']
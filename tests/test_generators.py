@@ -4,8 +4,103 @@
 """Generators module tests
 """
 
+import os
+import sys
 import pytest
-from corsair import RegisterMap, generators, config, utils
+import subprocess
+from pathlib import Path
+from corsair import RegisterMap, generators, config, utils, cache
+
+
+class TestJinja2:
+    """Class 'generators.Jinja2' testing."""
+
+    def test_env_shared(self, tmpdir):
+        """Environment is created once per templates path."""
+        gen_a = generators.Verilog()
+        gen_b = generators.Vhdl()
+        assert gen_a.j2_env() is gen_b.j2_env()
+        assert gen_a.j2_env(str(tmpdir)) is gen_b.j2_env(str(tmpdir))
+        assert gen_a.j2_env() is not gen_a.j2_env(str(tmpdir))
+
+    def test_bytecode_cache(self, tmpdir):
+        """Compiled templates are saved to the persistent cache."""
+        cache_dir = str(tmpdir.join('cache'))
+        cache.set_cache(cache_dir)
+        try:
+            output_file = str(tmpdir.join('regs.vh'))
+            generators.VerilogHeader(utils.create_template(), output_file).generate()
+            assert os.listdir(os.path.join(cache_dir, 'jinja2'))
+        finally:
+            cache.set_cache(None)
+
+
+class TestWriteFile:
+    """Function 'generators.write_file' testing."""
+
+    def test_write(self, tmpdir):
+        """File is written only if its content differs."""
+        path = tmpdir.join('out', 'file.txt')
+        assert generators.write_file(str(path), 'abc')
+        assert path.read() == 'abc'
+        os.utime(str(path), (0, 0))
+        assert not generators.write_file(str(path), 'abc')
+        assert path.mtime() == 0
+        assert generators.write_file(str(path), 'abd')
+        assert generators.write_file(str(path), b'abcd')
+        assert path.read() == 'abcd'
+        assert tmpdir.join('out').listdir() == [path]
+
+    def test_mode(self, tmpdir):
+        """Permissions of the existing file are kept."""
+        path = tmpdir.join('file.txt')
+        path.write('abc')
+        path.chmod(0o640)
+        assert generators.write_file(str(path), 'abd')
+        assert path.stat().mode & 0o777 == 0o640
+
+    @pytest.mark.skipif(os.name != 'posix', reason="POSIX permissions are required")
+    def test_umask(self, tmpdir):
+        """Permissions of the new file are set by the current umask."""
+        umask = os.umask(0o027)
+        try:
+            assert generators.write_file(str(tmpdir.join('file.txt')), 'abc')
+            assert generators.write_file(str(tmpdir.join('stream.txt')), iter(['abc']))
+        finally:
+            os.umask(umask)
+        assert tmpdir.join('file.txt').stat().mode & 0o777 == 0o640
+        assert tmpdir.join('stream.txt').stat().mode & 0o777 == 0o640
+
+    def test_stream(self, tmpdir, monkeypatch):
+        """Chunks are written as they come, but the file is replaced only if its content differs."""
+        monkeypatch.setattr(generators, 'WRITE_CHUNK_SIZE', 4)
+        path = tmpdir.join('out', 'file.txt')
+        path.dirpath().ensure(dir=True)
+        path.write('abcdef\u00e9')
+        path.chmod(0o640)
+        os.utime(str(path), (0, 0))
+        assert not generators.write_file(str(path), iter(['ab', 'c', 'def', '\u00e9']))
+        assert path.mtime() == 0
+        assert generators.write_file(str(path), iter(['ab', 'c', 'def', '\u00e9', 'g']))
+        assert path.read_text('utf-8') == 'abcdef\u00e9g'
+        assert path.stat().mode & 0o777 == 0o640
+        assert generators.write_file(str(path), iter([b'ab', b'c']))
+        assert path.read() == 'abc'
+        assert generators.write_file(str(tmpdir.join('empty.txt')), iter([]))
+        assert tmpdir.join('empty.txt').read() == ''
+        assert tmpdir.join('out').listdir() == [path]
+
+    def test_outputs(self, tmpdir):
+        """Generator reports which files were changed."""
+        output_file = str(tmpdir.join('regs.vh'))
+        rmap = utils.create_template()
+        gen = generators.VerilogHeader(rmap, output_file)
+        gen.generate()
+        assert gen.outputs == {output_file: True}
+        gen = generators.VerilogHeader(rmap, output_file)
+        gen.generate()
+        assert gen.outputs == {output_file: False}
+        assert 'outputs' not in gen.make_target('v_header')['v_header']
 
 
 class TestJson:
@@ -186,6 +281,78 @@ class TestMarkdown:
         assert '## Register map' in raw_str
         assert 'Back to [Register map](#register-map-summary).' in raw_str
 
+    def test_md_images(self, tmpdir, monkeypatch):
+        """Images rendered by worker processes are the same as rendered in the current process."""
+        rmap = utils.create_template()
+        images = {}
+        for jobs in (1, 2):
+            monkeypatch.setattr(generators.Wavedrom, 'draw_jobs', jobs)
+            monkeypatch.setattr(generators.Wavedrom, 'draw_jobs_threshold', 1)
+            md_path = tmpdir.join('jobs%d' % jobs, 'regs.md')
+            md_path.dirpath().ensure(dir=True)
+            generators.Markdown(rmap, str(md_path), image_dir='img').generate()
+            images[jobs] = {p.basename: p.read() for p in md_path.dirpath('img').listdir()}
+        assert sorted(images[1].keys()) == sorted('%s.svg' % reg.name_lower for reg in rmap)
+        assert images[1] == images[2]
+
+    def test_md_images_spawn(self, tmpdir):
+        """Images are drawn by the script without main module guard, when processes are started with 'spawn'."""
+        script = tmpdir.join('script.py')
+        script.write('\n'.join([
+            "import multiprocessing",
+            "from corsair import Register, BitField, RegisterMap, generators",
+            "multiprocessing.set_start_method('spawn')",
+            "rmap = RegisterMap()",
+            "rmap.add_registers_bulk([Register('reg%d' % i, 'Register', i * 4).add_bitfields(",
+            "    BitField('bf', 'Bit field', lsb=i)) for i in range(32)])",
+            "generators.Markdown(rmap, 'regs.md', image_dir='img').generate()",
+        ]))
+        env = os.environ.copy()
+        env['PYTHONPATH'] = os.pathsep.join([str(Path(__file__).parent.parent.absolute()), env.get('PYTHONPATH', '')])
+        res = subprocess.run([sys.executable, str(script)], cwd=str(tmpdir), env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        assert res.returncode == 0, res.stdout
+        assert len(tmpdir.join('img').listdir()) == 32
+
+    def test_md_images_cache(self, tmpdir, monkeypatch):
+        """Images are taken from the persistent cache and only changed layouts are rendered."""
+        cache.set_cache(str(tmpdir.join('cache')))
+        monkeypatch.setattr(generators, '_wavedrom_svgs', {})
+        try:
+            rmap = utils.create_template()
+            md_path = str(tmpdir.join('regs.md'))
+            generators.Markdown(rmap, md_path).generate()
+            rendered = []
+
+            def render(reg_wd):
+                rendered.append(reg_wd)
+                return '<svg/>'
+            monkeypatch.setattr(generators, '_wavedrom_render', render)
+            # new process - nothing in the memory
+            monkeypatch.setattr(generators, '_wavedrom_svgs', {})
+            generators.Markdown(rmap, md_path).generate()
+            assert rendered == []
+            rmap[0][0].name = 'new_name'
+            generators.Asciidoc(rmap, str(tmpdir.join('regs.adoc'))).generate()
+            assert len(rendered) == 1
+            assert 'new_name' in rendered[0]
+        finally:
+            cache.set_cache(None)
+
+    def test_md_images_memo(self, tmpdir, monkeypatch):
+        """Only recently used images are kept in the memory of the process."""
+        monkeypatch.setattr(generators, '_wavedrom_svgs', {})
+        monkeypatch.setattr(generators, 'WAVEDROM_MEMO_SIZE', 2)
+        monkeypatch.setattr(generators, '_wavedrom_render', lambda reg_wd: '<svg/>')
+        rmap = utils.create_template()
+        assert len(rmap) > 2
+        generators.Markdown(rmap, str(tmpdir.join('regs.md'))).generate()
+        assert len(generators._wavedrom_svgs) == 2
+        # image used again is kept
+        for key in ['a', 'b', 'a', 'c']:
+            generators._wavedrom_memo(key, '<svg/>')
+        assert list(generators._wavedrom_svgs.keys()) == ['a', 'c']
+
 
 class TestAsciidoc:
     """Class 'generators.Asciidoc' testing."""
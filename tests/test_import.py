@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Package import tests.
+"""
+
+import os
+import sys
+import subprocess
+from pathlib import Path
+from corsair import utils, generators
+
+# Heavy dependencies, which have to be imported only when they are needed
+HEAVY_MODULES = ['jinja2', 'yaml', 'wavedrom', 'concurrent.futures']
+
+# Dependencies to compare import time of corsair with
+REFERENCE_MODULES = ['jinja2', 'yaml', 'wavedrom']
+
+
+def run_python(*args):
+    """Run Python in a separate process and return its stdout and stderr."""
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.pathsep.join([str(Path(__file__).parent.parent.absolute()), env.get('PYTHONPATH', '')])
+    res = subprocess.run([sys.executable] + list(args), env=env,
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    assert res.returncode == 0, res.stderr
+    return res.stdout, res.stderr
+
+
+def import_times(*args):
+    """Run Python with import time tracing. Return dictionary: module -> cumulative import time in microseconds."""
+    _, stderr = run_python('-X', 'importtime', *args)
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_time():
+    """Importing of corsair doesn't load heavy dependencies and takes less time than they do."""
+    times = import_times('-c', 'import corsair')
+    assert [m for m in HEAVY_MODULES if m in times] == []
+    # modules are imported by the same process, so the load of the machine affects all of them alike
+    ratios = []
+    for _ in range(3):
+        times = import_times('-c', 'import corsair, %s' % ', '.join(REFERENCE_MODULES))
+        ratios.append(times['corsair'] / sum(times[m] for m in REFERENCE_MODULES))
+    assert min(ratios) < 1
+
+
+def test_version():
+    """Printing of the version doesn't load heavy dependencies."""
+    times = import_times('-m', 'corsair', '-v')
+    assert [m for m in HEAVY_MODULES if m in times] == []
+
+
+def test_read_json(tmpdir):
+    """Reading of JSON register map doesn't load heavy dependencies."""
+    path = str(tmpdir.join('regs.json'))
+    generators.Json(utils.create_template(), path).generate()
+    stdout, _ = run_python('-c', 'import sys, corsair; corsair.RegisterMap().read_file(%s); '
+                                 'print([m for m in %s if m in sys.modules])' % (repr(path), repr(HEAVY_MODULES)))
+    assert stdout.strip() == '[]'
@@ -5,7 +5,7 @@
 """
 
 import pytest
-from corsair import Register, BitField
+from corsair import Register, BitField, config
 import copy
 
 
@@ -144,8 +144,20 @@ def test_field_position_conflict():
     reg = Register('REGA', 'Register A')
     reg.add_bitfields(BitField('bf_a', 'Bit field A', lsb=0, width=8))
     reg.add_bitfields(BitField('bf_b', 'Bit field B', lsb=8, width=8))
-    with pytest.raises(AssertionError):
+    with pytest.raises(AssertionError, match=r"'bf_c' conflicts with other bit field\(s\): \['bf_a', 'bf_b'\]"):
         reg.add_bitfields(BitField('bf_c', 'Bit field C', lsb=4, width=10))
+    reg.add_bitfields(BitField('bf_d', 'Bit field D', lsb=16, width=1))
+
+
+def test_field_position_conflict_moved():
+    """Test of adding a field to the position of other field, which was moved after it had been added."""
+    reg = Register('REGA', 'Register A')
+    bf_a = BitField('bf_a', 'Bit field A', lsb=0)
+    reg.add_bitfields(bf_a)
+    bf_a.lsb = 4
+    with pytest.raises(AssertionError, match=r"'bf_b' conflicts with other bit field\(s\): \['bf_a'\]"):
+        reg.add_bitfields(BitField('bf_b', 'Bit field B', lsb=4))
+    reg.add_bitfields(BitField('bf_c', 'Bit field C', lsb=0))
 
 
 def test_field_order():
@@ -186,3 +198,40 @@ def test_custom_props():
     reg = Register(the_answer=42)
     assert reg.etc['the_answer'] == 42
     assert reg.as_dict()['the_answer'] == 42
+
+
+def test_field_position_conflict_validate():
+    """Test of validation of a register with bit fields moved to overlapping positions."""
+    reg = Register('REGA', 'Register A', 0x0)
+    reg.add_bitfields([
+        BitField('bf_a', 'Bit field A', lsb=0, width=4),
+        BitField('bf_b', 'Bit field B', lsb=4, width=4),
+        BitField('bf_c', 'Bit field C', lsb=8, width=4),
+    ])
+    reg.validate()
+    reg['bf_c'].lsb = 2
+    with pytest.raises(AssertionError, match=r"'bf_a' conflicts with other bit field\(s\): \['bf_c'\]"):
+        reg.validate()
+
+
+def test_compact_layout():
+    """Register has no instance dictionary, custom properties dictionary is created on demand."""
+    reg = Register()
+    assert not hasattr(reg, '__dict__')
+    assert reg.as_dict()['name'] == 'csr0'
+    reg.etc['the_answer'] = 42
+    assert reg.as_dict()['the_answer'] == 42
+
+
+def test_name_case():
+    """Name variants follow renaming and changes of the forced name case."""
+    reg = Register('RegA', 'Register A', 0x0)
+    assert (reg.name, reg.name_lower, reg.name_upper, reg.name_capitalized) == ('RegA', 'rega', 'REGA', 'Rega')
+    globcfg = config.default_globcfg()
+    globcfg['force_name_case'] = 'upper'
+    config.set_globcfg(globcfg)
+    assert (reg.name, reg.name_lower) == ('REGA', 'rega')
+    reg.name = 'RegB'
+    assert reg.name == 'REGB'
+    config.set_globcfg(config.default_globcfg())
+    assert reg.name == 'RegB'
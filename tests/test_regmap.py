@@ -5,8 +5,13 @@
 """
 
 import pytest
-from corsair import config, Register, BitField, RegisterMap
+from corsair import config, regmap, Register, BitField, RegisterMap
 import copy
+import io
+import json
+import pickle
+import time
+import yaml
 
 
 def test_create():
@@ -190,3 +195,271 @@ def test_reg_unique():
     rmap[1].name = 'rega'
     with pytest.raises(AssertionError):
         rmap.validate()
+
+
+def test_reg_rename_lookup():
+    """Test of access to a register by name after it was renamed inside a map."""
+    rmap = RegisterMap()
+    rmap.add_registers([
+        Register('reg_a', 'Register A', 0x0),
+        Register('reg_b', 'Register B', 0x4),
+    ])
+    rmap['reg_a'].name = 'reg_c'
+    assert rmap['reg_c'].address == 0x0
+    with pytest.raises(KeyError):
+        rmap['reg_a']
+    rmap.add_registers(Register('reg_a', 'Register A', 0x8))
+    with pytest.raises(AssertionError):
+        rmap.add_registers(Register('reg_c', 'Register C', 0xC))
+
+
+def test_reg_readdress_conflict():
+    """Test of address conflict check after an address of a register was changed inside a map."""
+    rmap = RegisterMap()
+    rmap.add_registers([
+        Register('reg_a', 'Register A', 0x0),
+        Register('reg_b', 'Register B', 0x4),
+    ])
+    rmap['reg_b'].address = 0x10
+    rmap.add_registers(Register('reg_c', 'Register C', 0x4))
+    with pytest.raises(AssertionError):
+        rmap.add_registers(Register('reg_d', 'Register D', 0x10))
+    assert rmap.reg_names == ['reg_a', 'reg_c', 'reg_b']
+
+
+def test_add_registers_bulk():
+    """Test of adding many registers at once."""
+    rmap = RegisterMap()
+    rmap.add_registers(Register('reg_a', 'Register A', 0x8))
+    rmap.add_registers_bulk([
+        Register('reg_b', 'Register B', 0x10),
+        Register('reg_c', 'Register C', 0x4),
+        Register('reg_d', 'Register D', 0x0),
+    ])
+    assert rmap.reg_names == ['reg_d', 'reg_c', 'reg_a', 'reg_b']
+    assert rmap['reg_c'].address == 0x4
+
+
+def test_add_registers_bulk_auto_incr():
+    """Test of auto increment of addresses when registers are added at once."""
+    globcfg = config.default_globcfg()
+    globcfg['address_increment'] = 'data_width'
+    config.set_globcfg(globcfg)
+    rmap = RegisterMap()
+    rmap.add_registers_bulk([
+        Register('reg_a', 'Register A', 0x10),
+        Register('reg_b', 'Register B'),
+        Register('reg_c', 'Register C', 0x0),
+        Register('reg_d', 'Register D'),
+    ])
+    assert [reg.address for reg in rmap] == [0x0, 0x10, 0x14, 0x18]
+    config.set_globcfg(config.default_globcfg())
+
+
+def test_add_registers_bulk_conflicts():
+    """Test of name and address conflicts when registers are added at once. Map must stay untouched."""
+    rmap = RegisterMap()
+    rmap.add_registers(Register('reg_a', 'Register A', 0x0))
+    with pytest.raises(AssertionError):
+        rmap.add_registers_bulk([
+            Register('reg_b', 'Register B', 0x4),
+            Register('reg_b', 'Register B copypaste', 0x8),
+        ])
+    with pytest.raises(AssertionError):
+        rmap.add_registers_bulk([
+            Register('reg_b', 'Register B', 0x4),
+            Register('reg_c', 'Register C', 0x0),
+        ])
+    assert rmap.reg_names == ['reg_a']
+
+
+def test_validate_scaling():
+    """Time of the register map validation has to grow linearly with the number of registers."""
+    def validate_time(regs_num):
+        rmap = RegisterMap()
+        rmap.add_registers_bulk([Register('reg%d' % i, 'Register', i * 4).add_bitfields(
+            [BitField('bf%d' % j, 'Bit field', lsb=j * 8, width=8) for j in range(4)]) for i in range(regs_num)])
+        times = []
+        for _ in range(5):
+            rmap[0].description = 'Register'  # to validate it again
+            start = time.perf_counter()
+            rmap.validate()
+            times.append(time.perf_counter() - start)
+        return min(times)
+    # 8x more registers: linear growth gives ~8x more time, quadratic ~64x
+    assert validate_time(4000) / validate_time(500) < 20
+
+
+def test_index_other_registers(monkeypatch):
+    """Changes of registers outside of the map don't make its lookup indexes outdated."""
+    rmap = RegisterMap()
+    other_rmap = RegisterMap()
+    rmap.add_registers(Register('reg_a', 'Register A', 0x0))
+    reg_x = Register('reg_x', 'Register X', 0x0)
+    other_rmap.add_registers(reg_x)
+    updates = []
+    index_update = RegisterMap._index_update
+    monkeypatch.setattr(RegisterMap, '_index_update', lambda self: updates.append(self._index_state) or
+                        index_update(self))
+    for i in range(1, 4):
+        reg = Register()
+        reg.name = 'reg_%d' % i
+        reg.address = i * 4
+        reg_x.name = 'reg_x%d' % i
+        rmap.add_registers(reg)
+    assert None not in updates
+    # change of the register inside the map
+    rmap['reg_1'].name = 'reg_b'
+    assert rmap['reg_b'].address == 0x4
+    with pytest.raises(KeyError):
+        rmap['reg_1']
+    assert None in updates
+
+
+def test_pickle_renamed():
+    """Registers renamed and moved before pickling are found by new names and addresses in another process."""
+    rmap = RegisterMap()
+    rmap.add_registers([Register('reg_a', 'Register A', 0x0), Register('reg_b', 'Register B', 0x4)])
+    reg_a, reg_b = rmap['reg_a'], rmap['reg_b']
+    reg_a.name = 'reg_c'
+    reg_b.address = 0x8
+    rmap = pickle.loads(pickle.dumps(rmap))
+    assert rmap['reg_c'].name == 'reg_c'
+    with pytest.raises(KeyError):
+        rmap['reg_a']
+    with pytest.raises(AssertionError):
+        rmap.add_registers(Register('reg_d', 'Register D', 0x8))
+    rmap.add_registers(Register('reg_e', 'Register E', 0x4))
+    assert rmap.reg_names == ['reg_c', 'reg_e', 'reg_b']
+
+
+def test_validate_once(monkeypatch):
+    """Unchanged register map is not validated again."""
+    calls = []
+    reg_validate = Register.validate
+    monkeypatch.setattr(Register, 'validate', lambda reg: calls.append(reg.name) or reg_validate(reg))
+    rmap = RegisterMap()
+    rmap.add_registers([Register('reg_a', 'Register A', 0x0).add_bitfields(BitField('bf_a', 'Bit field A')),
+                        Register('reg_b', 'Register B', 0x4)])
+    rmap.validate()
+    rmap.validate()
+    assert calls == ['reg_a', 'reg_b']
+    # model is changed
+    rmap['reg_a']['bf_a'].width = 2
+    rmap.validate()
+    assert len(calls) == 4
+    rmap.add_registers(Register('reg_c', 'Register C', 0x8))
+    rmap.validate()
+    assert len(calls) == 7
+    # configuration is changed
+    globcfg = config.default_globcfg()
+    globcfg['data_width'] = 16
+    config.set_globcfg(globcfg)
+    rmap.validate()
+    assert len(calls) == 10
+    # copy made by another process is still valid for the same configuration
+    rmap = pickle.loads(pickle.dumps(rmap))
+    rmap.validate()
+    assert len(calls) == 10
+    config.set_globcfg(config.default_globcfg())
+    rmap = pickle.loads(pickle.dumps(rmap))
+    rmap.validate()
+    assert len(calls) == 13
+    # copy of the map changed after the validation
+    rmap['reg_b'].description = 'Register B changed'
+    rmap = pickle.loads(pickle.dumps(rmap))
+    rmap.validate()
+    assert len(calls) == 16
+    # invalid map is validated every time
+    rmap['reg_a']['bf_a'].lsb = 31
+    for _ in range(2):
+        with pytest.raises(AssertionError):
+            rmap.validate()
+
+
+YAML_REGMAP = """
+version: 1
+common: &common_bf
+    name: val
+    description: Value
+    access: rw
+    hardware: o
+regmap:
+-   name: reg_a
+    description: Register A
+    address: 0x8
+    bitfields:
+    -   *common_bf
+-   name: reg_b
+    description: Register B
+    address: 0
+    the_answer: 42
+    bitfields:
+    -   <<: *common_bf
+        width: 8
+        enums:
+        -   {name: zero, value: 0, description: Zero}
+extra: [1, 2, 3]
+"""
+
+
+@pytest.mark.parametrize('loader', [yaml.SafeLoader, regmap._yaml_loader()])
+def test_read_yaml_stream(tmpdir, monkeypatch, loader):
+    """Test of reading YAML file in stream mode."""
+    monkeypatch.setattr(regmap, 'YamlLoader', loader)
+    path = str(tmpdir.join('regs.yaml'))
+    with open(path, 'w') as f:
+        f.write(YAML_REGMAP)
+    rmap = RegisterMap()
+    rmap.read_file(path)
+    rmap_stream = RegisterMap()
+    rmap_stream.read_file(path, stream=True)
+    assert rmap_stream == rmap
+    assert rmap_stream.reg_names == ['reg_b', 'reg_a']
+    assert rmap_stream['reg_b'].etc['the_answer'] == 42
+    assert rmap_stream['reg_b']['val'].width == 8
+    assert rmap_stream['reg_b']['val']['zero'].value == 0
+
+
+JSON_REGMAP = """{
+    "version": 12345,
+    "regmap": [
+        {"name": "reg_a", "description": "Register A", "address": 8,
+         "bitfields": [{"name": "val", "description": "Value, \\"quoted\\" [0]", "width": 8}]},
+        {"name": "reg_b", "description": "Register B", "address": 0, "the_answer": 42,
+         "bitfields": [{"name": "val", "description": "Value", "enums": [
+            {"name": "zero", "value": 0, "description": "Zero"}]}]}
+    ],
+    "extra": {"list": [1, 2.5, null, true]}
+}
+"""
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 2**16])
+def test_json_iter_regmap(chunk_size):
+    """Test of incremental parsing of a JSON register map with different chunk sizes."""
+    items = list(regmap._json_iter_regmap(io.StringIO(JSON_REGMAP), chunk_size))
+    assert items == json.loads(JSON_REGMAP)['regmap']
+
+
+def test_json_iter_regmap_errors():
+    """Test of incremental parsing of broken JSON register maps."""
+    with pytest.raises(ValueError):
+        list(regmap._json_iter_regmap(io.StringIO(JSON_REGMAP[:-20]), 7))
+    with pytest.raises(ValueError):
+        list(regmap._json_iter_regmap(io.StringIO('{"regmap": [{"name": "a"} {"name": "b"}]}'), 7))
+    with pytest.raises(KeyError):
+        list(regmap._json_iter_regmap(io.StringIO('{"regs": []}'), 7))
+
+
+def test_read_json_stream(tmpdir):
+    """Test of reading JSON file in stream mode."""
+    path = str(tmpdir.join('regs.json'))
+    with open(path, 'w') as f:
+        f.write(JSON_REGMAP)
+    rmap = RegisterMap()
+    rmap.read_file(path)
+    rmap_stream = RegisterMap()
+    rmap_stream.read_file(path, stream=True)
+    assert rmap_stream == rmap
+    assert rmap_stream.reg_names == ['reg_b', 'reg_a']